@@ -1,56 +1,27 @@
 import sounddevice as sd
-import numpy as np
-from scipy import signal as sig
 import tkinter as tk
-from tkinter import ttk
-import threading
-import queue
+from tkinter import ttk, messagebox
 from audiorecord import load_or_record_signals
-from filters import improved_bandpass_filter
+from filters import prewarm_filter_cache
 from signalprocessing import process_signals
 from ploting import plot_signals, save_plots
+from realtime import RealTimeEngine
+from liveview import TkLiveView
 from playaudio import *
 
 # Parámetros de grabación
 fs = 24000  # Frecuencia de muestreo de 24 KHz (múltiplo de 8 KHz)
-real_time_processing = False
+real_time_engine = None
 
 def start_real_time_processing():
-    global real_time_processing
-    real_time_processing = True
-    
-    audio_queue = queue.Queue() # Define the audio_queue
-    record_thread = threading.Thread(target=record_audio, args=(audio_queue, fs))
-    process_thread = threading.Thread(target=process_audio, args=(audio_queue, fs, 16000))
-    
-    record_thread.start()
-    process_thread.start()
+    global real_time_engine
+    if real_time_engine is None:
+        real_time_engine = RealTimeEngine(fs, monitor=True)
+    real_time_engine.start()
 
 def stop_real_time_processing():
-    global real_time_processing
-    real_time_processing = False
-
-# Función para grabar el audio
-def record_audio(queue, fs):
-    while real_time_processing:
-        audio = sd.rec(int(1 * fs), samplerate=fs, channels=1, dtype='int16')
-        sd.wait()
-        audio = audio.flatten()
-        queue.put(audio)
-
-def process_audio(queue, fs, new_fs):
-    while real_time_processing:
-        if not queue.empty():
-            audio = queue.get()
-            filtered_audio = improved_bandpass_filter(audio, 300, 3400, fs)
-            
-            # Resamplear el audio filtrado
-            new_fs = 8000 # Nueva tasa de muestreo deseada
-            filtered_audio_resampled = sig.resample_poly(filtered_audio, new_fs, fs)
-            
-            filtered_audio_8bit = np.int8(filtered_audio_resampled / np.max(np.abs(filtered_audio_resampled)) * 127)
-            sd.play(filtered_audio_8bit, new_fs)
-            sd.wait()
+    if real_time_engine is not None:
+        real_time_engine.stop()
 
 class AudioPlayerGUI:
     def __init__(self, master):
@@ -65,6 +36,9 @@ class AudioPlayerGUI:
     
     def signal_processing(self):
         global processed_a, processed_e, processed_i, demux_a, demux_e, demux_i, fs_multiplexed, multiplexed
+        if a_signal is None or e_signal is None or i_signal is None:
+            messagebox.showerror("Error", "Debe grabar todas las señales primero.")
+            return
         processed_a, processed_e, processed_i, demux_a, demux_e, demux_i, fs_multiplexed, multiplexed = process_signals(a_signal, e_signal, i_signal, 24000)
         
     def create_widgets(self):
@@ -75,7 +49,11 @@ class AudioPlayerGUI:
         self.style.configure("TFrame", padding=6, background="#eee")
 
         frame = ttk.Frame(self.master, style="TFrame")
-        frame.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        frame.pack(side=tk.LEFT, padx=10, pady=10, fill=tk.BOTH, expand=True)
+
+        # Espectrogramas en vivo del modo en tiempo real, a la derecha de los controles
+        self.live_view = TkLiveView(self.master, fs)
+        self.live_view.pack(side=tk.RIGHT, padx=10, pady=10, fill=tk.BOTH, expand=True)
 
         self.load_button = ttk.Button(frame, text="Load/Record Signals", command=self.load_signals, style="TButton")
         self.load_button.pack(pady=5)
@@ -99,12 +77,20 @@ class AudioPlayerGUI:
         self.create_audio_controls(frame, "Processed E", lambda: play_processed_e(demux_e))
         self.create_audio_controls(frame, "Processed I", lambda: play_processed_i(demux_i))
         
-        self.real_time_button = ttk.Button(frame, text="Start Real-Time Processing", command=start_real_time_processing, style="TButton")
+        self.real_time_button = ttk.Button(frame, text="Start Real-Time Processing", command=self.start_real_time, style="TButton")
         self.real_time_button.pack(pady=5)
         
-        self.stop_real_time_button = ttk.Button(frame, text="Stop Real-Time Processing", command=stop_real_time_processing, style="TButton")
+        self.stop_real_time_button = ttk.Button(frame, text="Stop Real-Time Processing", command=self.stop_real_time, style="TButton")
         self.stop_real_time_button.pack(pady=5)
 
+    def start_real_time(self):
+        start_real_time_processing()
+        self.live_view.start(real_time_engine)
+
+    def stop_real_time(self):
+        self.live_view.stop()
+        stop_real_time_processing()
+
     def plot_signals_wrapper(self):
         global a_signal, e_signal, i_signal, processed_a, processed_e, processed_i, demux_a, demux_e, demux_i, multiplexed, fs_multiplexed
         signals = {
@@ -160,7 +146,12 @@ demux_e = None
 demux_i = None
 multiplexed = None
 
-# Crear la GUI
-root = tk.Tk()
-app = AudioPlayerGUI(root)
-root.mainloop()
+# Sólo al ejecutarlo: los procesos de save_plots importan este módulo y no deben abrir la GUI
+if __name__ == '__main__':
+    # Diseñar los filtros antes de empezar a procesar
+    prewarm_filter_cache(fs)
+
+    # Crear la GUI
+    root = tk.Tk()
+    app = AudioPlayerGUI(root)
+    root.mainloop()
@@ -4,13 +4,15 @@ import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sounddevice as sd
-from scipy.io.wavfile import read, write
+from scipy.io.wavfile import write
+from wavio import read_wav
 
 # Función para grabar una señal de audio con ventana de control
 def check_or_record_audio(filename, root, fs):
     if os.path.exists(filename):
         print(f"Archivo {filename} encontrado. Cargando...")
-        sample_rate, audio = read(filename)
+        # Mapeado en memoria: grabaciones largas no se copian completas a RAM
+        sample_rate, audio = read_wav(filename)
         if sample_rate != fs:
             print(f"Advertencia: La frecuencia de muestreo del archivo {filename} es {sample_rate} Hz, no {fs} Hz como se esperaba.")
         return audio
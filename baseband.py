@@ -0,0 +1,54 @@
+import numpy as np
+import scipy.signal as sig
+from math import gcd
+from nco import carrier_wave
+
+
+# Frecuencia central del grupo de portadoras y la menor tasa compleja (múltiplo de fs_new)
+# que contiene la banda ocupada [fc_min - fs_new/2, fc_max + fs_new/2] con margen para los filtros
+def baseband_plan(carriers, fs_new=8000):
+    center = (min(carriers) + max(carriers)) / 2
+    span = max(carriers) - min(carriers) + fs_new
+    fs_baseband = int(np.ceil((span + fs_new) / fs_new)) * fs_new
+    return center, fs_baseband
+
+# Pasa la envolvente compleja z (a fs_baseband, centrada en `center`) a la señal real a fs,
+# en la misma precisión que z
+def to_passband(samples, center, fs_baseband, fs):
+    factor = gcd(int(fs), int(fs_baseband))
+    upsampled = sig.resample_poly(samples, int(fs) // factor, int(fs_baseband) // factor, axis=-1)
+    dtype = np.finfo(samples.dtype).dtype
+    shifted = upsampled.astype(np.result_type(dtype, np.complex64), copy=False)
+    shifted *= carrier_wave(center, fs, upsampled.shape[-1], analytic=True, dtype=dtype)
+    return shifted.real
+
+# Inversa de to_passband: baja la señal real a fs a su envolvente compleja a fs_baseband
+def to_baseband(signal, center, fs, fs_baseband):
+    factor = gcd(int(fs), int(fs_baseband))
+    dtype = np.finfo(np.result_type(signal.dtype, np.float32)).dtype
+    shifted = signal * np.conj(carrier_wave(center, fs, signal.shape[-1], analytic=True, dtype=dtype))
+    return 2 * sig.resample_poly(shifted, int(fs_baseband) // factor, int(fs) // factor, axis=-1)
+
+
+# Señal multiplexada representada por su envolvente compleja: la versión real
+# (la que se grafica o se exporta) sólo se calcula cuando se pide
+class BasebandSignal:
+    def __init__(self, samples, center, fs_baseband, fs):
+        self.samples = samples
+        self.center = center
+        self.fs_baseband = fs_baseband
+        self.fs = fs
+        self.real = None
+
+    def __len__(self):
+        return self.samples.shape[-1] * int(self.fs) // int(self.fs_baseband)
+
+    # Se calcula una vez y se reutiliza (graficar y guardar piden la misma señal real)
+    def to_real(self):
+        if self.real is None:
+            self.real = to_passband(self.samples, self.center, self.fs_baseband, self.fs)
+        return self.real
+
+    @classmethod
+    def from_real(cls, signal, center, fs, fs_baseband):
+        return cls(to_baseband(signal, center, fs, fs_baseband), center, fs_baseband, fs)
@@ -0,0 +1,126 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from precision import DEFAULT_DTYPE, FLOAT_DTYPES
+from signalprocessing import carrier_plan, process_channels, process_channels_baseband
+from streaming import DEFAULT_BLOCK_SIZE, save_signals_streaming
+from wavio import SAMPLE_FORMATS, WavWriter, iter_wav_blocks, read_wav
+
+DEFAULT_VOWELS = ('a', 'e', 'i')
+
+
+# Directorios (recorridos recursivamente) que tienen un WAV por cada vocal
+def find_input_sets(paths, vowels=DEFAULT_VOWELS):
+    sets = []
+    for path in paths:
+        for directory, _, files in os.walk(path):
+            if all(f'{v}.wav' in files for v in vowels):
+                sets.append(directory)
+    return sorted(set(sets))
+
+def load_set(directory, vowels=DEFAULT_VOWELS):
+    rates = set()
+    signals = []
+    for v in vowels:
+        fs, audio = read_wav(os.path.join(directory, f'{v}.wav'))
+        if audio.ndim > 1:
+            audio = audio[:, 0]
+        rates.add(fs)
+        signals.append(audio)
+    if len(rates) != 1:
+        raise ValueError(f"Frecuencias de muestreo distintas en {directory}: {sorted(rates)}")
+    return rates.pop(), signals
+
+# Procesa un juego de señales y escribe acondicionadas (8 bits), multiplexada y demultiplexadas
+# en sample_format. Con streaming=True se lee, procesa y escribe por bloques sin cargar los archivos
+def process_set(directory, output_dir, vowels=DEFAULT_VOWELS, demux='direct', mux='time', upsample='repeat',
+                quantizer='peak', baseband=False, sample_format='float32', streaming=False,
+                block_size=DEFAULT_BLOCK_SIZE, dtype=DEFAULT_DTYPE):
+    start = time.perf_counter()
+    carriers = carrier_plan(len(vowels))[0]
+    if streaming:
+        filenames = [os.path.join(directory, f'{v}.wav') for v in vowels]
+        fs = read_wav(filenames[0])[0]
+        save_signals_streaming(iter_wav_blocks(filenames, block_size), fs, output_dir, vowels, sample_format,
+                               carriers=carriers, agc=quantizer == 'agc', dtype=dtype)
+        return directory, time.perf_counter() - start
+
+    fs, signals = load_set(directory, vowels)
+    if baseband:
+        processed, demuxed, fs_multiplexed, multiplexed = process_channels_baseband(
+            signals, fs, carriers, quantizer=quantizer, dtype=dtype)
+        multiplexed = multiplexed.to_real()
+    else:
+        processed, demuxed, fs_multiplexed, multiplexed = process_channels(
+            signals, fs, carriers, demux=demux, mux=mux, upsample=upsample, quantizer=quantizer, dtype=dtype)
+
+    os.makedirs(output_dir, exist_ok=True)
+    for v, conditioned, channel in zip(vowels, processed, demuxed):
+        # WAV de 8 bits: PCM sin signo con offset de 128
+        with WavWriter(os.path.join(output_dir, f'conditioned_{v}.wav'), 8000, sample_format='int8',
+                       full_scale=127) as writer:
+            writer.write(conditioned)
+        with WavWriter(os.path.join(output_dir, f'demux_{v}.wav'), 8000, sample_format=sample_format,
+                       full_scale=128) as writer:
+            writer.write(channel)
+    with WavWriter(os.path.join(output_dir, 'multiplexed.wav'), fs_multiplexed, sample_format=sample_format,
+                   full_scale=128 * len(vowels)) as writer:
+        writer.write(multiplexed)
+    return directory, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Procesa lotes de señales (a.wav, e.wav, i.wav) sin interfaz gráfica")
+    parser.add_argument('inputs', nargs='+', help="Directorios a recorrer en busca de juegos de WAV")
+    parser.add_argument('-o', '--output', default='./output', help="Directorio raíz de salida")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Procesos (por defecto, uno por núcleo)")
+    parser.add_argument('--vowels', nargs='+', default=list(DEFAULT_VOWELS))
+    parser.add_argument('--demux', choices=('direct', 'decimate', 'channelizer'), default='direct')
+    parser.add_argument('--mux', choices=('time', 'fft'), default='time')
+    parser.add_argument('--upsample', choices=('repeat', 'multistage'), default='repeat')
+    parser.add_argument('--quantizer', choices=('peak', 'agc'), default='peak')
+    parser.add_argument('--baseband', action='store_true', help="Simulación en banda base compleja")
+    parser.add_argument('--format', choices=list(SAMPLE_FORMATS), default='float32',
+                        help="Formato de muestra de la multiplexada y las demultiplexadas")
+    parser.add_argument('--dtype', choices=FLOAT_DTYPES, default=DEFAULT_DTYPE,
+                        help="Precisión de los cálculos intermedios")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Leer, procesar y escribir por bloques (demux directo, sin banda base)")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help="Muestras por bloque con --streaming")
+    args = parser.parse_args(argv)
+    if args.streaming and (args.baseband or args.demux != 'direct' or args.mux != 'time' or args.upsample != 'repeat'):
+        parser.error("--streaming sólo admite --demux direct, --mux time, --upsample repeat y sin --baseband")
+
+    sets = find_input_sets(args.inputs, args.vowels)
+    if not sets:
+        print("No se encontraron juegos de señales", file=sys.stderr)
+        return 1
+    print(f"{len(sets)} juego(s) de señales")
+
+    options = dict(vowels=tuple(args.vowels), demux=args.demux, mux=args.mux, upsample=args.upsample,
+                   quantizer=args.quantizer, baseband=args.baseband, sample_format=args.format,
+                   streaming=args.streaming, block_size=args.block_size, dtype=args.dtype)
+    failures = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {}
+        root = os.path.commonpath([os.path.abspath(path) for path in args.inputs])
+        for directory in sets:
+            relative = os.path.relpath(os.path.abspath(directory), root)
+            output_dir = os.path.normpath(os.path.join(args.output, relative))
+            futures[executor.submit(process_set, directory, output_dir, **options)] = directory
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                directory, elapsed = future.result()
+                print(f"[{done}/{len(sets)}] {directory} ({elapsed:.2f} s)")
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(sets)}] Error en {futures[future]}: {e}", file=sys.stderr)
+    print(f"Listo en {time.perf_counter() - start:.2f} s, {failures} error(es)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
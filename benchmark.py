@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+import numpy as np
+import scipy
+import scipy.signal as sig
+from filters import improved_bandpass_filter, impulse_response
+from precision import FLOAT_DTYPES
+from signalprocessing import (carrier_plan, condition_channels, demodulate, modulate_sum, process_channels,
+                              process_channels_baseband)
+
+# Duraciones (s) con 3 canales y cantidades de canales (con 10 s) que se miden por defecto
+DEFAULT_DURATIONS = (1, 10, 60, 600)
+DEFAULT_CHANNELS = (3, 8, 16, 32)
+CHANNEL_SWEEP_DURATION = 10
+
+# Formantes aproximados (Hz) de las vocales usadas para las señales sintéticas
+VOWEL_FORMANTS = {
+    'a': (730, 1090, 2440),
+    'e': (530, 1840, 2480),
+    'i': (270, 2290, 3010),
+}
+
+
+# Señal tipo vocal determinística: tren de pulsos glotales con jitter filtrado por tres formantes
+def synthetic_vowel(duration, fs, vowel='a', f0=120.0, seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(duration * fs)
+    period = fs / f0
+    jitter = 1 + 0.01 * rng.standard_normal(int(n / period) + 2)
+    pulses = np.zeros(n)
+    positions = np.cumsum(period * jitter)
+    pulses[positions[positions < n].astype(int)] = 1.0
+    voiced = sig.lfilter([1.0], [1.0, -0.95], pulses)
+    for formant in VOWEL_FORMANTS[vowel]:
+        bandwidth = 80 + formant / 20
+        r = np.exp(-np.pi * bandwidth / fs)
+        theta = 2 * np.pi * formant / fs
+        voiced = sig.lfilter([1 - r], [1, -2 * r * np.cos(theta), r * r], voiced)
+    voiced += 0.002 * rng.standard_normal(n)
+    return np.int16(voiced / np.max(np.abs(voiced)) * 20000)
+
+# Un canal por vocal (cíclicamente), con distinta f0 y semilla para cada uno
+def synthetic_channels(n_channels, duration, fs, seed=0):
+    vowels = list(VOWEL_FORMANTS)
+    return np.stack([synthetic_vowel(duration, fs, vowels[k % len(vowels)], 100 + 7 * k, seed + k)
+                     for k in range(n_channels)])
+
+
+def measure(func, repeat):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), peak
+
+
+# Largos (muestras por canal) y tasas del barrido de --crossover
+CROSSOVER_LENGTHS = (1000, 4000, 16000, 64000, 256000, 1024000)
+CROSSOVER_RATES = (8000, 24000, 192000)
+
+# Etapas a medir para una entrada dada: nombre -> función sin argumentos
+def pipeline_stages(channels, fs, plot=False, workers=(), dtypes=()):
+    carriers, fs_multiplexed = carrier_plan(len(channels))
+    carriers = np.asarray(carriers, dtype=float)
+    processed = condition_channels(channels, fs)
+    upsampled = np.repeat(processed, fs_multiplexed // 8000, axis=-1)
+    multiplexed = modulate_sum(upsampled, carriers, fs_multiplexed)
+    # Buffers preasignados de la suma y de la fila de trabajo, como en multiplex_channels
+    length = upsampled.shape[-1]
+    out, work = np.empty((2, length))
+
+    stages = {
+        'bandpass': lambda: improved_bandpass_filter(channels, 300, 3400, fs),
+        'condition': lambda: condition_channels(channels, fs),
+        'modulate': lambda: modulate_sum(upsampled, carriers, fs_multiplexed, out=out, work=work),
+        'demodulate': lambda: demodulate(multiplexed, carriers, fs_multiplexed),
+        'pipeline': lambda: process_channels(channels, fs),
+        'pipeline[demux=decimate]': lambda: process_channels(channels, fs, demux='decimate'),
+        'pipeline[demux=channelizer]': lambda: process_channels(channels, fs, demux='channelizer'),
+        'pipeline[mux=fft,demux=channelizer]': lambda: process_channels(channels, fs, mux='fft',
+                                                                         demux='channelizer'),
+        'pipeline[baseband]': lambda: process_channels_baseband(channels, fs),
+    }
+    for n in workers:
+        stages[f'pipeline[workers={n}]'] = lambda n=n: process_channels(channels, fs, workers=n)
+    for dtype in dtypes:
+        buffers = np.empty((2, length), dtype)
+        stages[f'modulate[{dtype}]'] = lambda dtype=dtype, b=buffers: modulate_sum(
+            upsampled, carriers, fs_multiplexed, dtype, b[0], b[1])
+        stages[f'demodulate[{dtype}]'] = lambda dtype=dtype, x=multiplexed.astype(dtype): demodulate(
+            x, carriers, fs_multiplexed, dtype)
+        stages[f'pipeline[{dtype}]'] = lambda dtype=dtype: process_channels(channels, fs, dtype=dtype)
+    if plot:
+        import io
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from ploting import plot_spectrum_and_time
+
+        def plot_multiplexed():
+            plot_spectrum_and_time(multiplexed, fs_multiplexed, 'benchmark', save=True, filename=io.BytesIO())
+            plt.close('all')
+        stages['plot'] = plot_multiplexed
+    return stages
+
+
+# Relación señal/error (dB) de una salida respecto de la de referencia
+def snr_db(reference, other):
+    error = np.sum((np.asarray(reference, float) - other) ** 2)
+    return np.inf if error == 0 else 10 * np.log10(np.sum(np.asarray(reference, float) ** 2) / error)
+
+# Precisión de cada modo del pipeline en `dtype` contra float64: fracción de muestras de 8 bits
+# que cambian, peor SNR de los canales demultiplexados y SNR de la multiplexada
+def dtype_accuracy(channels, fs, dtype):
+    modes = {'direct': {}, 'decimate': {'demux': 'decimate'},
+             'channelizer': {'demux': 'channelizer', 'mux': 'fft'}, 'multistage': {'upsample': 'multistage'}}
+    accuracy = []
+    for mode, kwargs in modes.items():
+        processed, demuxed, _, multiplexed = process_channels(channels, fs, **kwargs)
+        processed_low, demuxed_low, _, multiplexed_low = process_channels(channels, fs, dtype=dtype, **kwargs)
+        accuracy.append({
+            'mode': mode,
+            'dtype': dtype,
+            'channels': len(channels),
+            'duration': channels.shape[-1] / fs,
+            'output_dtype': multiplexed_low.dtype.name,
+            'quantized_mismatch': float(np.mean(processed != processed_low)),
+            'demux_snr_db': float(min(snr_db(a, b) for a, b in zip(demuxed, demuxed_low))),
+            'multiplexed_snr_db': float(snr_db(multiplexed, multiplexed_low)),
+        })
+        r = accuracy[-1]
+        print(f"precisión {dtype} {mode:12s} {len(channels):3d} ch  8 bits distintos {100 * r['quantized_mismatch']:6.3f} %  "
+              f"demux {r['demux_snr_db']:6.1f} dB  multiplexada {r['multiplexed_snr_db']:6.1f} dB")
+    return accuracy
+
+
+# Cruce sosfilt/FFT del pasa banda 300-3400 Hz: para cada fs y largo, cuántas veces más rápido
+# es overlap-save que sosfilt (>1 = conviene la FFT). Sirve para ajustar filters.FFT_FILTER_CROSSOVER
+def filter_crossover(dtypes, repeat, n_channels=3, lengths=CROSSOVER_LENGTHS, rates=CROSSOVER_RATES):
+    rng = np.random.default_rng(0)
+    crossover = []
+    for dtype in dtypes:
+        for fs in rates:
+            n_taps = len(impulse_response('bandpass', 10, (300, 3400), fs, dtype))
+            for length in lengths:
+                x = rng.standard_normal((n_channels, length)).astype(dtype)
+                direct, _ = measure(lambda: improved_bandpass_filter(x, 300, 3400, fs, dtype=dtype, method='direct'),
+                                    repeat)
+                fft, _ = measure(lambda: improved_bandpass_filter(x, 300, 3400, fs, dtype=dtype, method='fft'), repeat)
+                crossover.append({'dtype': dtype, 'fs': fs, 'taps': n_taps, 'length': length,
+                                  'direct_seconds': direct, 'fft_seconds': fft})
+                print(f"cruce {dtype} {fs:6d} Hz ({n_taps:5d} taps) {length:8d} muestras  "
+                      f"sosfilt {direct * 1000:9.2f} ms  FFT {fft * 1000:9.2f} ms  x{direct / fft:5.2f}")
+    return crossover
+
+
+def run_case(n_channels, duration, fs, repeat, stages=None, plot=False, workers=(), dtypes=(), accuracy=None):
+    channels = synthetic_channels(n_channels, duration, fs)
+    results = []
+    if accuracy is not None:
+        for dtype in dtypes:
+            if dtype != 'float64':
+                accuracy += dtype_accuracy(channels, fs, dtype)
+    for name, func in pipeline_stages(channels, fs, plot, workers, dtypes).items():
+        if stages and name not in stages:
+            continue
+        seconds, peak = measure(func, repeat)
+        results.append({
+            'stage': name,
+            'channels': n_channels,
+            'duration': duration,
+            'samples': int(channels.size),
+            'seconds': seconds,
+            'samples_per_sec': channels.size / seconds,
+            'peak_bytes': peak,
+        })
+        print(f"{name:38s} {n_channels:3d} ch {duration:6g} s  {seconds:9.4f} s  "
+              f"{channels.size / seconds / 1e6:8.2f} Msamples/s  {peak / 2**20:9.1f} MiB")
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r['stage'], r['channels'], r['duration']): r for r in json.load(f)['results']}
+    print(f"\nComparación con {baseline_path} (>1 = más rápido ahora)")
+    for r in results:
+        old = baseline.get((r['stage'], r['channels'], r['duration']))
+        if old is not None:
+            print(f"{r['stage']:38s} {r['channels']:3d} ch {r['duration']:6g} s  "
+                  f"x{old['seconds'] / r['seconds']:6.2f} tiempo  x{old['peak_bytes'] / max(r['peak_bytes'], 1):6.2f} memoria")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline FDM con señales sintéticas")
+    parser.add_argument('--durations', type=float, nargs='*', default=DEFAULT_DURATIONS)
+    parser.add_argument('--channels', type=int, nargs='*', default=DEFAULT_CHANNELS)
+    parser.add_argument('--fs', type=int, default=24000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stages', nargs='*', help="Sólo estas etapas (por defecto todas)")
+    parser.add_argument('--plot', action='store_true', help="Medir también plot_spectrum_and_time")
+    parser.add_argument('--workers', type=int, nargs='*', default=[],
+                        help="Medir también process_channels con estos tamaños de pool de hilos")
+    parser.add_argument('--dtypes', nargs='*', default=[], choices=FLOAT_DTYPES,
+                        help="Medir también modulación, demodulación y pipeline en estos tipos, "
+                             "con la precisión de cada uno contra float64")
+    parser.add_argument('--crossover', action='store_true',
+                        help="Medir el cruce sosfilt/FFT del pasa banda en los tipos de --dtypes (o float64)")
+    parser.add_argument('--output', help="Archivo JSON donde guardar los resultados")
+    parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    results = []
+    accuracy = []
+    crossover = filter_crossover(args.dtypes or ['float64'], args.repeat) if args.crossover else []
+    for duration in args.durations:
+        results += run_case(3, duration, args.fs, args.repeat, args.stages, args.plot, args.workers, args.dtypes,
+                            accuracy)
+    for n_channels in args.channels:
+        if n_channels != 3 or CHANNEL_SWEEP_DURATION not in args.durations:
+            results += run_case(n_channels, CHANNEL_SWEEP_DURATION, args.fs, args.repeat, args.stages, args.plot,
+                                args.workers, args.dtypes, accuracy)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'fs': args.fs,
+        'repeat': args.repeat,
+        'results': results,
+        'accuracy': accuracy,
+        'crossover': crossover,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
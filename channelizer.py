@@ -0,0 +1,67 @@
+import numpy as np
+from math import gcd, lcm
+from filters import hann_window, improved_bandpass_filter, kaiser_lowpass_taps
+from precision import complex_dtype, float_dtype
+
+# Cantidad de muestras de salida que se calculan por tanda (acota la memoria)
+CHUNK_OUTPUTS = 4096
+
+
+# Banco de filtros: M canales separados fs/M y decimación D = fs/fs_new
+def channelizer_plan(carriers, fs, fs_new=8000):
+    decimation = fs // fs_new
+    spacing = gcd(int(fs), *[int(fc) for fc in carriers])
+    n_channels = lcm(int(fs) // spacing, decimation)
+    bins = [int(fc) * n_channels // int(fs) for fc in carriers]
+    return n_channels, decimation, bins
+
+
+# Canalizador polifásico con FFT: baja a banda base y decima todas las portadoras en una pasada.
+# La salida k es Re(sum_n h[n] x[mD+g-n] e^{-j 2 pi fc_k (mD+g-n) / fs}), es decir lo mismo que
+# mezclar con cos(2 pi fc_k t), filtrar con h y decimar por D (con el retardo g compensado)
+def channelize(signal, carriers, fs, fs_new=8000, taps=None, dtype=None):
+    dtype = float_dtype(dtype)
+    n_channels, decimation, bins = channelizer_plan(carriers, fs, fs_new)
+    if taps is None:
+        taps = kaiser_lowpass_taps(fs_new / 2, fs, odd=True, dtype=dtype)
+    delay = (len(taps) - 1) // 2
+
+    # Prototipo con largo múltiplo de M, dado vuelta para aplicarlo como correlación
+    n_taps = -(-len(taps) // n_channels) * n_channels
+    reversed_taps = np.zeros(n_taps, dtype)
+    reversed_taps[n_taps - len(taps):] = np.asarray(taps)[::-1]
+    ratio = n_channels // decimation
+    reversed_taps = reversed_taps.reshape(n_taps // n_channels, ratio, decimation)
+
+    length = signal.shape[-1]
+    n_out = -(-length // decimation)
+    rows_needed = n_out + n_taps // decimation
+    padded = np.zeros(rows_needed * decimation, dtype)
+    start = n_taps - 1 - delay
+    stop = min(length, len(padded) - start)
+    padded[start:start + stop] = signal[:stop]
+    rows = padded.reshape(rows_needed, decimation)
+
+    bins = np.asarray(bins)
+    output = np.empty((len(bins), n_out), dtype)
+    for first in range(0, n_out, CHUNK_OUTPUTS):
+        count = min(CHUNK_OUTPUTS, n_out - first)
+        folded = np.zeros((count, n_channels), dtype)
+        for q in range(reversed_taps.shape[0]):
+            for a in range(ratio):
+                row = first + q * ratio + a
+                folded[:, a * decimation:(a + 1) * decimation] += reversed_taps[q, a] * rows[row:row + count]
+        spectrum = np.fft.rfft(folded, axis=-1)[:, bins]
+        # Corrección de fase por la posición absoluta de cada ventana
+        m = np.arange(first, first + count)
+        shift = (m * decimation + delay - n_taps + 1) % n_channels
+        rotation = np.exp(-2j * np.pi * np.outer(shift, bins) / n_channels).astype(complex_dtype(dtype))
+        output[:, first:first + count] = (spectrum * rotation).real.T
+    return output
+
+
+# Reemplazo directo de las cadenas demodulate/resample_poly/bandpass de process_signals
+def demultiplex_channelizer(signal, carriers, fs, fs_new=8000, lowcut=300.0, highcut=3400.0, dtype=None):
+    window = hann_window(signal.shape[-1], dtype)
+    baseband = channelize(signal * window, carriers, fs, fs_new, dtype=dtype)
+    return improved_bandpass_filter(baseband, lowcut, highcut, fs_new, dtype=dtype)
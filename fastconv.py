@@ -0,0 +1,57 @@
+import numpy as np
+import scipy.fft
+import scipy.signal as sig
+
+# Largo de la FFT respecto del filtro: bloques más largos amortizan mejor el solapamiento
+FFT_SIZE_FACTOR = 8
+# Muestras de salida que se calculan por tanda (acota la memoria de los espectros)
+CHUNK_SAMPLES = 1 << 20
+# Hilos de scipy.fft (-1 = todos los núcleos)
+FFT_WORKERS = -1
+# Energía relativa de la cola que se descarta al truncar la respuesta de un IIR, por tipo:
+# el error de amplitud queda en ~1e-10 (float64) o ~1e-7 (float32) respecto de sosfilt
+IMPULSE_TOLERANCE = {'float64': 1e-20, 'float32': 1e-14}
+
+
+# Respuesta al impulso de un filtro SOS (float64) truncada donde la energía restante cae por
+# debajo de la tolerancia del tipo; así un IIR estable se aplica como FIR por FFT
+def sos_impulse_response(sos, fs, dtype='float64', max_seconds=2.0):
+    tolerance = IMPULSE_TOLERANCE[dtype]
+    impulse = np.zeros(int(max_seconds * fs))
+    impulse[0] = 1.0
+    h = sig.sosfilt(sos, impulse)
+    tail_energy = np.cumsum(h[::-1] ** 2)[::-1]
+    below = np.flatnonzero(tail_energy < tolerance * tail_energy[0])
+    return h[:below[0]] if len(below) else h
+
+# Largo de FFT (rápido para scipy.fft) para un filtro de n_taps y una señal de `length` muestras
+def fft_size(n_taps, length):
+    return min(scipy.fft.next_fast_len(FFT_SIZE_FACTOR * n_taps, real=True),
+               scipy.fft.next_fast_len(length + n_taps - 1, real=True))
+
+# Espectro del filtro para overlap-save con FFT de n_fft puntos
+def frequency_response(taps, n_fft, dtype='float64'):
+    return scipy.fft.rfft(np.asarray(taps, dtype), n=n_fft)
+
+
+# Filtrado causal por overlap-save sobre el último eje: igual a lfilter(taps, 1, x)
+# (o a sosfilt con la respuesta truncada), con el espectro H = rfft(taps, n_fft) ya calculado.
+# Cada tanda de bloques se transforma de una vez con `workers` hilos de scipy.fft
+def overlap_save(x, response, n_taps, n_fft, workers=FFT_WORKERS):
+    x = np.asarray(x)
+    length = x.shape[-1]
+    step = n_fft - (n_taps - 1)
+    n_blocks = -(-length // step)
+    padded = np.zeros(x.shape[:-1] + (n_taps - 1 + n_blocks * step + n_fft,), x.dtype)
+    padded[..., n_taps - 1:n_taps - 1 + length] = x
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft, axis=-1)[..., :n_blocks * step:step, :]
+
+    output = np.empty(x.shape[:-1] + (n_blocks * step,), x.dtype)
+    blocks_per_chunk = max(1, CHUNK_SAMPLES // n_fft)
+    for first in range(0, n_blocks, blocks_per_chunk):
+        last = min(first + blocks_per_chunk, n_blocks)
+        spectrum = scipy.fft.rfft(frames[..., first:last, :], axis=-1, workers=workers)
+        spectrum *= response
+        blocks = scipy.fft.irfft(spectrum, n=n_fft, axis=-1, workers=workers)[..., n_taps - 1:]
+        output[..., first * step:last * step] = blocks.reshape(x.shape[:-1] + (-1,))
+    return output[..., :length]
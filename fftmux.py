@@ -0,0 +1,42 @@
+import numpy as np
+import scipy.fft
+from math import gcd, lcm
+from precision import as_float, complex_dtype
+
+
+# Cantidad de muestras a fs_new por la que debe ser divisible la señal para que
+# cada portadora caiga exactamente en un bin del espectro a fs_multiplexed
+def fft_length_multiple(carriers, fs_new, fs_multiplexed):
+    upsample_factor = fs_multiplexed // fs_new
+    period = lcm(*[int(fs_multiplexed) // gcd(int(fc), int(fs_multiplexed)) for fc in carriers])
+    return period // gcd(period, upsample_factor)
+
+
+# Multiplexor en frecuencia para archivos completos: una rfft por canal a fs_new, los
+# espectros se ubican alrededor del bin de cada portadora y una sola irfft da la señal
+# multiplexada. Equivale a interpolar cada canal sin imágenes (en lugar de np.repeat),
+# modularlo con cos(2 pi fc t) y aplicar la ventana de Hann (hecha como convolución de 3 bins)
+def multiplex_fft(channels, carriers, fs_new, fs_multiplexed, dtype=None):
+    channels = as_float(np.atleast_2d(channels), dtype)
+    upsample_factor = fs_multiplexed // fs_new
+    length = channels.shape[-1]
+    multiple = fft_length_multiple(carriers, fs_new, fs_multiplexed)
+    padded_length = -(-length // multiple) * multiple
+    n_fft = padded_length * upsample_factor
+
+    spectra = scipy.fft.rfft(channels, n=padded_length, axis=-1, workers=-1) * (0.5 * upsample_factor)
+    half = padded_length // 2
+    if padded_length % 2 == 0:
+        # El bin de Nyquist se reparte entre la frecuencia positiva y la negativa
+        spectra[:, half] *= 0.5
+
+    spectrum = np.zeros(n_fft // 2 + 1, dtype=complex_dtype(dtype))
+    for channel_spectrum, fc in zip(spectra, carriers):
+        center = int(fc) * n_fft // int(fs_multiplexed)
+        spectrum[center:center + half + 1] += channel_spectrum
+        spectrum[center - half:center] += np.conj(channel_spectrum[half:0:-1])
+
+    windowed = 0.5 * spectrum
+    windowed[1:] -= 0.25 * spectrum[:-1]
+    windowed[:-1] -= 0.25 * spectrum[1:]
+    return scipy.fft.irfft(windowed, n=n_fft, workers=-1)[:length * upsample_factor]
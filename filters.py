@@ -1,17 +1,141 @@
+import weakref
 import numpy as np
 import scipy.signal as sig
+from functools import lru_cache
+from fastconv import FFT_SIZE_FACTOR, fft_size, frequency_response, overlap_save, sos_impulse_response
+from precision import as_float, float_dtype
 
-def improved_bandpass_filter(data, lowcut, highcut, fs, order=10):
+# Cantidad máxima de diseños guardados en la caché (se descartan los menos usados)
+FILTER_CACHE_SIZE = 64
+# Umbral de method='auto', en múltiplos del largo de la respuesta al impulso: a partir de ahí
+# se filtra por FFT (overlap-save). Medido con benchmark.py --crossover en un núcleo: en float32
+# la FFT gana desde ~5-10 veces el largo del filtro (y es más precisa que sosfilt en simple
+# precisión); en float64 sosfilt empata o gana en todos los largos, así que no se cambia (None)
+FFT_FILTER_CROSSOVER = {'float32': 8, 'float64': None}
+# Ventanas de Hann guardadas: pocas, porque a 192 KHz cada una ocupa tanto como la señal
+WINDOW_CACHE_SIZE = 4
+# Largo máximo de una ventana memoizada (~22 s a 192 KHz, 32 MiB en float64): las más largas se
+# arman en cada llamada, para no dejar en memoria una ventana del largo de una grabación de horas
+WINDOW_CACHE_MAX_LENGTH = 1 << 22
+
+# Diseño de filtros memoizado por (tipo, orden, bordes de banda, fs, tipo de dato).
+# Siempre se diseña en float64; los coeficientes se redondean recién al tipo pedido
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def design_filter(kind, order, edges, fs, dtype='float64'):
     nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    sos = sig.butter(order, [low, high], btype='band', analog=False, output='sos')
-    filtered_data = sig.sosfilt(sos, data)
+    if kind == 'bandpass':
+        low, high = edges
+        design = sig.butter(order, [low / nyq, high / nyq], btype='band', analog=False, output='sos')
+    elif kind == 'lowpass':
+        cutoff, = edges
+        design = sig.butter(order, cutoff / nyq, btype='low', analog=False, output='sos')
+    elif kind in ('kaiser', 'kaiser_odd'):
+        # Para los FIR de Kaiser el "orden" es la atenuación en dB
+        cutoff, width = edges
+        N, beta = sig.kaiserord(order, width=width/nyq)
+        if kind == 'kaiser_odd':
+            # Largo impar: retardo de grupo entero, sin corrimiento de media muestra
+            N |= 1
+        design = sig.firwin(N, cutoff, window=('kaiser', beta), scale=True, fs=fs)
+    else:
+        raise ValueError(f"Tipo de filtro desconocido: {kind}")
+    # Los diseños se comparten entre llamadas, no deben modificarse in-place
+    return design.astype(dtype)
+
+# Respuesta al impulso del diseño (truncada para los IIR), memoizada como el diseño
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def impulse_response(kind, order, edges, fs, dtype='float64'):
+    design = design_filter(kind, order, edges, fs)
+    if kind in ('bandpass', 'lowpass'):
+        design = sos_impulse_response(design, fs, dtype)
+    return design.astype(dtype)
+
+# Espectro del diseño para overlap-save con FFT de n_fft puntos
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def fft_response(kind, order, edges, fs, dtype, n_fft):
+    return frequency_response(impulse_response(kind, order, edges, fs, dtype), n_fft, dtype)
+
+# Filtra con un diseño SOS de la caché. method='direct' usa sosfilt, method='fft' overlap-save
+# con la respuesta truncada y method='auto' elige según FFT_FILTER_CROSSOVER
+def sos_filter(data, kind, order, edges, fs, dtype=None, method='auto'):
+    dtype = float_dtype(dtype)
+    data = as_float(data, dtype)
+    if method == 'auto':
+        crossover = FFT_FILTER_CROSSOVER[dtype]
+        long_signal = crossover is not None and \
+            data.shape[-1] >= crossover * len(impulse_response(kind, order, edges, fs, dtype))
+        method = 'fft' if long_signal else 'direct'
+    if method == 'direct':
+        return sig.sosfilt(design_filter(kind, order, edges, fs, dtype), data)
+    if method == 'fft':
+        n_taps = len(impulse_response(kind, order, edges, fs, dtype))
+        n_fft = fft_size(n_taps, data.shape[-1])
+        return overlap_save(data, fft_response(kind, order, edges, fs, dtype, n_fft), n_taps, n_fft)
+    raise ValueError(f"Método de filtrado desconocido: {method}")
+
+def bandpass_sos(lowcut, highcut, fs, order=10, dtype=None):
+    return design_filter('bandpass', order, (lowcut, highcut), fs, float_dtype(dtype))
+
+def lowpass_sos(cutoff, fs, order=6, dtype=None):
+    return design_filter('lowpass', order, (cutoff,), fs, float_dtype(dtype))
+
+# Taps FIR de Kaiser (60 dB) usados como filtro anti-alias al decimar
+def kaiser_lowpass_taps(cutoff, fs, width=None, ripple_db=60, odd=False, dtype=None):
+    if width is None:
+        width = cutoff
+    return design_filter('kaiser_odd' if odd else 'kaiser', ripple_db, (cutoff, width), fs, float_dtype(dtype))
+
+# Precalcula los diseños que usa la aplicación para sacarlos del camino crítico
+def prewarm_filter_cache(fs=24000, fs_new=8000, fs_multiplexed=192000, lowcut=300.0, highcut=3400.0, dtype=None):
+    for rate in (fs, fs_new, fs_multiplexed):
+        bandpass_sos(lowcut, highcut, rate, dtype=dtype)
+    kaiser_lowpass_taps(fs_new / 2, fs, dtype=dtype)
+    kaiser_lowpass_taps(fs_new / 2, fs_multiplexed, dtype=dtype)
+    kaiser_lowpass_taps(fs_new / 2, fs_multiplexed, odd=True, dtype=dtype)
+    # Si el tipo filtra por FFT, también la respuesta truncada (segundos de sosfilt a 192 KHz) y su
+    # espectro con el largo de FFT que usan las señales largas
+    dtype = float_dtype(dtype)
+    if FFT_FILTER_CROSSOVER[dtype] is not None:
+        for rate in (fs, fs_new, fs_multiplexed):
+            n_taps = len(impulse_response('bandpass', 10, (lowcut, highcut), rate, dtype))
+            fft_response('bandpass', 10, (lowcut, highcut), rate, dtype, fft_size(n_taps, FFT_SIZE_FACTOR * n_taps))
+    return design_filter.cache_info()
+
+@lru_cache(maxsize=WINDOW_CACHE_SIZE)
+def _hann_window(length, dtype):
+    window = sig.windows.hann(length).astype(dtype, copy=False)
+    # Compartida entre la modulación y la demodulación: sólo lectura
+    window.flags.writeable = False
+    return window
+
+# Ventanas largas en uso: se comparten mientras alguien las tenga y se liberan después
+_long_windows = weakref.WeakValueDictionary()
+
+# Ventana de Hann del largo de la señal, en el tipo del pipeline. Hasta WINDOW_CACHE_MAX_LENGTH
+# muestras se memoiza; las más largas sólo se comparten mientras quien las pidió las retenga
+# (process_channels la retiene durante la llamada para que la usen modulación y demodulación)
+def hann_window(length, dtype=None):
+    dtype = float_dtype(dtype)
+    if length <= WINDOW_CACHE_MAX_LENGTH:
+        return _hann_window(length, dtype)
+    window = _long_windows.get((length, dtype))
+    if window is None:
+        window = sig.windows.hann(length).astype(dtype, copy=False)
+        window.flags.writeable = False
+        _long_windows[(length, dtype)] = window
+    return window
+
+def clear_filter_cache():
+    design_filter.cache_clear()
+    impulse_response.cache_clear()
+    fft_response.cache_clear()
+    _hann_window.cache_clear()
+    _long_windows.clear()
+
+def improved_bandpass_filter(data, lowcut, highcut, fs, order=10, dtype=None, method='auto'):
+    filtered_data = sos_filter(data, 'bandpass', order, (lowcut, highcut), fs, dtype, method)
     return filtered_data
 
-def lowpass_filter(data, cutoff, fs, order=6):
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    sos = sig.butter(order, normal_cutoff, btype='low', analog=False, output='sos')
-    filtered_data = sig.sosfilt(sos, data)
-    return filtered_data
\ No newline at end of file
+def lowpass_filter(data, cutoff, fs, order=6, dtype=None, method='auto'):
+    filtered_data = sos_filter(data, 'lowpass', order, (cutoff,), fs, dtype, method)
+    return filtered_data
@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+import tracemalloc
+
+# Perfilador activo (None = instrumentación desactivada)
+_profiler = None
+
+
+# Etapa vacía que se usa cuando no hay perfilador: no mide nada
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def output(self, *arrays):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _nbytes(arrays):
+    return sum(getattr(a, 'nbytes', 0) for a in arrays)
+
+def _shapes(arrays):
+    return [list(getattr(a, 'shape', ())) for a in arrays]
+
+def _mib(nbytes):
+    return '-' if nbytes is None else f"{nbytes / 2**20:.2f}"
+
+
+# Medición de una etapa: tiempo de pared, tiempo de CPU, memoria asignada (tracemalloc)
+# y tamaño de los arreglos de entrada/salida. El tiempo de CPU (process_time, que incluye los hilos
+# de scipy.fft de la etapa) y tracemalloc son globales al proceso: si la etapa se superpone con
+# otra (grupos de canales en hilos con workers > 1) incluyen lo de las demás, así que CPU, memoria
+# y pico no se informan (quedan en None, '-' en el reporte)
+class _Stage:
+    def __init__(self, profiler, name, arrays):
+        self.profiler = profiler
+        self.overlapped = False
+        self.record = {'stage': name, 'input_shapes': _shapes(arrays), 'input_bytes': _nbytes(arrays),
+                       'output_shapes': [], 'output_bytes': 0}
+
+    def __enter__(self):
+        alone = self.profiler.open_stage(self)
+        if self.profiler.trace_memory:
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+            if alone:
+                # Con otras etapas abiertas no se reinicia: les borraría su pico
+                tracemalloc.reset_peak()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall_end = time.perf_counter()
+        self.record['wall_time'] = wall_end - self.wall_start
+        cpu_time = time.process_time() - self.cpu_start
+        self.profiler.close_stage(self)
+        self.record['cpu_time'] = None if self.overlapped else cpu_time
+        if self.profiler.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self.record['allocated_bytes'] = None if self.overlapped else current - self.memory_start
+            self.record['peak_bytes'] = None if self.overlapped else peak - self.memory_start
+        self.record['start'] = self.wall_start - self.profiler.origin
+        self.record['thread'] = threading.get_ident()
+        self.profiler.add(self.record)
+        return False
+
+    def output(self, *arrays):
+        self.record['output_shapes'] = _shapes(arrays)
+        self.record['output_bytes'] = _nbytes(arrays)
+
+
+# Instrumentación opcional del pipeline:
+#     with Profiler() as profiler:
+#         process_signals(...)
+#     print(profiler.report())
+#     profiler.save_trace('trace.json')  # se abre con chrome://tracing o Perfetto
+class Profiler:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.started_tracing = False
+        self.previous = None
+        self.open_stages = set()
+
+    def __enter__(self):
+        global _profiler
+        self.previous = _profiler
+        _profiler = self
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.origin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _profiler
+        _profiler = self.previous
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        return False
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    # Registra una etapa abierta; si ya había otras, todas quedan marcadas como superpuestas.
+    # Devuelve True si es la única
+    def open_stage(self, stage):
+        with self.lock:
+            if self.open_stages:
+                stage.overlapped = True
+                for other in self.open_stages:
+                    other.overlapped = True
+            self.open_stages.add(stage)
+            return not stage.overlapped
+
+    def close_stage(self, stage):
+        with self.lock:
+            self.open_stages.discard(stage)
+
+    def stage(self, name, *arrays):
+        return _Stage(self, name, arrays)
+
+    def report(self):
+        lines = [f"{'etapa':28s} {'pared (ms)':>11s} {'CPU (ms)':>10s} {'asignado (MiB)':>15s} "
+                 f"{'pico (MiB)':>11s} {'salida (MiB)':>13s}  forma de salida"]
+        for r in self.records:
+            allocated = _mib(r.get('allocated_bytes', 0))
+            peak = _mib(r.get('peak_bytes', 0))
+            shapes = ' '.join('x'.join(map(str, s)) for s in r['output_shapes'])
+            cpu = '-' if r['cpu_time'] is None else f"{r['cpu_time'] * 1000:.2f}"
+            lines.append(f"{r['stage']:28s} {r['wall_time'] * 1000:11.2f} {cpu:>10s} "
+                         f"{allocated:>15s} {peak:>11s} {r['output_bytes'] / 2**20:13.2f}  {shapes}")
+        lines.append(f"{'total':28s} {self.elapsed() * 1000:11.2f}")
+        return '\n'.join(lines)
+
+    # Tiempo real entre el comienzo de la primera etapa y el final de la última (con etapas en
+    # paralelo es menor que la suma de sus tiempos de pared)
+    def elapsed(self):
+        if not self.records:
+            return 0.0
+        return max(r['start'] + r['wall_time'] for r in self.records) - min(r['start'] for r in self.records)
+
+    # Eventos en formato Trace Event (JSON) de Chrome
+    def trace_events(self):
+        return [{'name': r['stage'], 'ph': 'X', 'pid': 0, 'tid': r['thread'],
+                 'ts': r['start'] * 1e6, 'dur': r['wall_time'] * 1e6,
+                 'args': {k: v for k, v in r.items() if k not in ('stage', 'start', 'thread')}}
+                for r in self.records]
+
+    def save_trace(self, filename):
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': self.trace_events()}, f)
+
+
+# Punto de instrumentación del pipeline: sin perfilador activo devuelve una etapa vacía
+def stage(name, *arrays):
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_STAGE
+    return profiler.stage(name, *arrays)
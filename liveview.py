@@ -0,0 +1,226 @@
+import time
+import numpy as np
+import scipy.fft
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from filters import hann_window
+from signalprocessing import carrier_plan
+
+# Cuadros por segundo de la vista en vivo (dentro de 20-30 fps)
+VIEW_FPS = 25
+# Si el audio llega tarde se espacian los cuadros hasta este intervalo, en milisegundos
+MAX_FRAME_INTERVAL = 250
+# Avance y largo de la ventana de la STFT, en segundos (iguales para todas las frecuencias de
+# muestreo, así los espectrogramas avanzan juntos: 100 columnas por segundo)
+STFT_HOP_SECONDS = 0.01
+STFT_WINDOW_SECONDS = 0.04
+# Segundos visibles en los espectrogramas
+HISTORY_SECONDS = 5.0
+# Escala de color en dB respecto del fondo de escala (una senoidal a escala completa da 0 dB)
+DB_RANGE = (-100.0, 0.0)
+COLORMAP = 'viridis'
+# Filas que se dibujan por espectrograma: los bins de la STFT se agrupan tomando el máximo (no
+# se pierden picos) para que matplotlib no remuestree en cada cuadro más filas que píxeles
+DISPLAY_ROWS = 128
+
+
+# STFT incremental: cada push() agrega las muestras nuevas y devuelve las columnas (en dB) de
+# las ventanas que se completaron; lo que sobra queda pendiente para el próximo bloque, así que
+# cada muestra se transforma una sola vez sin importar cómo lleguen cortados los bloques
+class IncrementalSTFT:
+    def __init__(self, fs, full_scale=1.0, hop_seconds=STFT_HOP_SECONDS, window_seconds=STFT_WINDOW_SECONDS):
+        self.fs = fs
+        self.hop = int(round(hop_seconds * fs))
+        self.n_fft = int(round(window_seconds * fs))
+        self.window = hann_window(self.n_fft, 'float32')
+        self.scale = 2.0 / (full_scale * self.window.sum())
+        self.pending = np.zeros(self.n_fft - self.hop, np.float32)
+
+    @property
+    def frequencies(self):
+        return scipy.fft.rfftfreq(self.n_fft, 1 / self.fs)
+
+    def push(self, samples):
+        data = np.concatenate((self.pending, np.asarray(samples, np.float32)))
+        n_frames = (len(data) - self.n_fft) // self.hop + 1 if len(data) >= self.n_fft else 0
+        self.pending = data[n_frames * self.hop:]
+        if n_frames == 0:
+            return np.empty((0, self.n_fft // 2 + 1), np.float32)
+        frames = np.lib.stride_tricks.sliding_window_view(data, self.n_fft)[:n_frames * self.hop:self.hop]
+        magnitude = np.abs(scipy.fft.rfft(frames * self.window, axis=-1))
+        magnitude *= self.scale
+        return 20 * np.log10(np.maximum(magnitude, 10 ** (DB_RANGE[0] / 20)))
+
+
+# Historia RGBA del espectrograma que se desplaza. Cada columna se colorea una sola vez al
+# llegar (matplotlib no vuelve a aplicar norma y mapa de colores a la imagen entera en cada
+# cuadro) y se escribe dos veces en un arreglo del doble de ancho, de modo que la ventana
+# visible (de la más vieja a la más nueva) es siempre una vista contigua y desplazar no copia
+class ScrollingHistory:
+    def __init__(self, rows, columns, cmap=COLORMAP, db_range=DB_RANGE):
+        self.columns = columns
+        self.cmap = colormaps[cmap]
+        self.db_range = db_range
+        self.data = np.empty((rows, 2 * columns, 4), np.uint8)
+        self.data[:] = self.cmap(0.0, bytes=True)
+        self.position = 0
+
+    def append(self, new_columns):
+        new_columns = new_columns[-self.columns:]
+        low, high = self.db_range
+        colors = self.cmap((new_columns.T - low) / (high - low), bytes=True)
+        index = (self.position + np.arange(len(new_columns))) % self.columns
+        self.data[:, index] = colors
+        self.data[:, index + self.columns] = colors
+        self.position = (self.position + len(new_columns)) % self.columns
+
+    @property
+    def view(self):
+        return self.data[:, self.position:self.position + self.columns]
+
+
+# Máximo de cada grupo de `factor` bins consecutivos (el último grupo se completa con el piso)
+def pool_bins(columns, factor):
+    n, bins = columns.shape
+    rows = -(-bins // factor)
+    padded = np.full((n, rows * factor), DB_RANGE[0], np.float32)
+    padded[:, :bins] = columns
+    return padded.reshape(n, rows, factor).max(axis=-1)
+
+
+# Vista en vivo del modo en tiempo real, en una Figure de matplotlib:
+#   - espectrograma de la entrada (fs) y de la señal acondicionada (fs_new), con STFT incremental;
+#   - espectro actual de la banda multiplexada: la señal acondicionada modulada en `carrier` ocupa
+#     carrier ± f, así que se dibuja la última columna trasladada (-6 dB por la modulación) sin
+#     modular ni remuestrear nada a fs_multiplexed.
+# Los artistas son animados: el fondo (ejes, etiquetas) se guarda en cada redibujo completo y en
+# cada cuadro sólo se restauran, se pintan las imágenes y la línea y se hace blit
+class LiveView:
+    def __init__(self, figure, fs=24000, fs_new=8000, carrier=None, history=HISTORY_SECONDS):
+        if carrier is None:
+            carrier = carrier_plan(1, fs_new)[0][0]
+        self.figure = figure
+        self.incoming = IncrementalSTFT(fs, full_scale=32768)
+        self.conditioned = IncrementalSTFT(fs_new, full_scale=128)
+        columns = int(round(history / STFT_HOP_SECONDS))
+        self.incoming_pool = -(-(self.incoming.n_fft // 2 + 1) // DISPLAY_ROWS)
+        self.conditioned_pool = -(-(self.conditioned.n_fft // 2 + 1) // DISPLAY_ROWS)
+        self.incoming_history = ScrollingHistory(-(-(self.incoming.n_fft // 2 + 1) // self.incoming_pool), columns)
+        self.conditioned_history = ScrollingHistory(-(-(self.conditioned.n_fft // 2 + 1) // self.conditioned_pool), columns)
+
+        ax1, ax2, ax3 = figure.subplots(3, 1)
+        self.incoming_image = self._spectrogram(ax1, self.incoming_history, history,
+                                                self.incoming, self.incoming_pool, 'Entrada')
+        self.conditioned_image = self._spectrogram(ax2, self.conditioned_history, history,
+                                                   self.conditioned, self.conditioned_pool, 'Acondicionada')
+
+        f = self.conditioned.frequencies
+        self.band = np.concatenate((carrier - f[::-1], carrier + f))
+        self.spectrum_line, = ax3.plot(self.band, np.full(len(self.band), DB_RANGE[0]), animated=True)
+        ax3.axvline(carrier, color='gray', linestyle='--', linewidth=0.8)
+        ax3.set_xlim(self.band[0], self.band[-1])
+        ax3.set_ylim(*DB_RANGE)
+        ax3.set_title('Espectro multiplexado')
+        ax3.set_xlabel('Frecuencia (Hz)')
+        ax3.set_ylabel('dB')
+        figure.tight_layout()
+
+        self.artists = (self.incoming_image, self.conditioned_image, self.spectrum_line)
+        self.background = None
+        figure.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _spectrogram(self, ax, history, seconds, stft, pool, title):
+        top = history.data.shape[0] * pool * stft.fs / stft.n_fft
+        image = ax.imshow(history.view, origin='lower', aspect='auto', interpolation='none',
+                          extent=(-seconds, 0, 0, top), animated=True)
+        ax.set_ylim(0, stft.fs / 2)
+        ax.set_title(title)
+        ax.set_xlabel('Tiempo (s)')
+        ax.set_ylabel('Frecuencia (Hz)')
+        return image
+
+    # Redibujo completo (inicio, cambio de tamaño): se guarda el fondo sin los artistas animados
+    def _on_draw(self, event):
+        self.background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.figure.draw_artist(artist)
+
+    # Agrega muestras nuevas (int16 de la entrada, int8 acondicionadas) y actualiza los artistas
+    def push(self, incoming, conditioned):
+        incoming_columns = self.incoming.push(incoming)
+        conditioned_columns = self.conditioned.push(conditioned)
+        if len(incoming_columns):
+            self.incoming_history.append(pool_bins(incoming_columns, self.incoming_pool))
+            self.incoming_image.set_data(self.incoming_history.view)
+        if len(conditioned_columns):
+            self.conditioned_history.append(pool_bins(conditioned_columns, self.conditioned_pool))
+            self.conditioned_image.set_data(self.conditioned_history.view)
+            latest = conditioned_columns[-1] - 6.02
+            self.spectrum_line.set_ydata(np.concatenate((latest[::-1], latest)))
+
+    def blit(self):
+        canvas = self.figure.canvas
+        if self.background is None:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        self._draw_artists()
+        canvas.blit(self.figure.bbox)
+
+
+# LiveView embebida en una ventana de Tk y alimentada por los buffers de monitoreo de un
+# RealTimeEngine (creado con monitor=True). Todo corre en el hilo de la GUI con after(): el audio
+# sólo copia muestras y nunca espera a la vista. Si el motor informa callbacks tardíos se
+# duplica el intervalo entre cuadros (hasta MAX_FRAME_INTERVAL) para dejarle la CPU al audio
+class TkLiveView:
+    def __init__(self, master, fs=24000, fs_new=8000, carrier=None, fps=VIEW_FPS, figsize=(6, 7)):
+        self.master = master
+        self.figure = Figure(figsize=figsize)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.view = LiveView(self.figure, fs, fs_new, carrier)
+        self.widget = self.canvas.get_tk_widget()
+        self.frame_interval = int(1000 / fps)
+        self.interval = self.frame_interval
+        self.engine = None
+        self.job = None
+        self.late_seen = 0
+        self.incoming_scratch = None
+        self.conditioned_scratch = None
+        self.canvas.draw()
+
+    def pack(self, **kwargs):
+        self.widget.pack(**kwargs)
+
+    def start(self, engine):
+        if engine.monitor_input is None:
+            raise ValueError("El motor debe crearse con monitor=True")
+        self.stop()
+        self.engine = engine
+        self.incoming_scratch = np.empty(engine.monitor_input.capacity, np.int16)
+        self.conditioned_scratch = np.empty(engine.monitor_output.capacity, np.int8)
+        self.interval = self.frame_interval
+        self.late_seen = engine.late_callbacks
+        self.job = self.master.after(self.interval, self.tick)
+
+    def stop(self):
+        if self.job is not None:
+            self.master.after_cancel(self.job)
+            self.job = None
+        self.engine = None
+
+    def tick(self):
+        start = time.perf_counter()
+        engine = self.engine
+        if engine.late_callbacks > self.late_seen:
+            self.late_seen = engine.late_callbacks
+            self.interval = min(2 * self.interval, MAX_FRAME_INTERVAL)
+        n_in = engine.monitor_input.drain_into(self.incoming_scratch)
+        n_out = engine.monitor_output.drain_into(self.conditioned_scratch)
+        self.view.push(self.incoming_scratch[:n_in], self.conditioned_scratch[:n_out])
+        self.view.blit()
+        elapsed = int((time.perf_counter() - start) * 1000)
+        self.job = self.master.after(max(1, self.interval - elapsed), self.tick)
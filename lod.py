@@ -0,0 +1,107 @@
+import numpy as np
+
+# Factor entre niveles consecutivos de la pirámide
+PYRAMID_RATIO = 4
+# No se crean niveles con menos bloques que esto (el último nivel ya entra en cualquier pantalla)
+MIN_LEVEL_LENGTH = 1024
+# Ancho en píxeles que se usa si el eje todavía no tiene tamaño
+DEFAULT_PIXELS = 1000
+
+
+# Mínimo y máximo de cada bloque de `factor` muestras (el último bloque puede ser más corto)
+def minmax_reduce(mins, maxs, factor):
+    length = len(mins)
+    full = length // factor * factor
+    reduced_min = mins[:full].reshape(-1, factor).min(axis=1)
+    reduced_max = maxs[:full].reshape(-1, factor).max(axis=1)
+    if full < length:
+        reduced_min = np.append(reduced_min, mins[full:].min())
+        reduced_max = np.append(reduced_max, maxs[full:].max())
+    return reduced_min, reduced_max
+
+
+# Pirámide de envolventes min/max de una serie muestreada uniformemente (x = x0 + n dx).
+# El nivel k guarda el mínimo y el máximo de bloques de ratio^k muestras; cada nivel se
+# calcula a partir del anterior, así que construirla cuesta O(n) y ocupa ~2n/(ratio-1).
+# envelope() devuelve a lo sumo dos puntos por píxel tomando el nivel más grueso que alcanza,
+# por lo que dibujar o hacer zoom cuesta lo mismo sin importar el largo de la señal
+class MinMaxPyramid:
+    def __init__(self, signal, x0=0.0, dx=1.0, ratio=PYRAMID_RATIO):
+        self.signal = np.asarray(signal)
+        self.x0 = x0
+        self.dx = dx
+        self.ratio = ratio
+        self.levels = []
+        mins = maxs = self.signal
+        factor = 1
+        while len(mins) // ratio >= MIN_LEVEL_LENGTH:
+            mins, maxs = minmax_reduce(mins, maxs, ratio)
+            factor *= ratio
+            self.levels.append((factor, mins, maxs))
+
+    def __len__(self):
+        return len(self.signal)
+
+    @property
+    def extent(self):
+        return self.x0, self.x0 + (len(self.signal) - 1) * self.dx
+
+    # Puntos (x, y) a dibujar entre x_start y x_end con `pixels` columnas: las muestras tal cual
+    # si entran, o un par (mínimo, máximo) por columna en x del centro de cada una
+    def envelope(self, x_start, x_end, pixels=DEFAULT_PIXELS):
+        n = len(self.signal)
+        first = int(np.clip(np.floor((x_start - self.x0) / self.dx), 0, n - 1))
+        last = int(np.clip(np.ceil((x_end - self.x0) / self.dx) + 1, first + 1, n))
+        per_pixel = (last - first) / max(pixels, 1)
+        if per_pixel <= 2:
+            return self.x0 + np.arange(first, last) * self.dx, self.signal[first:last]
+
+        factor, mins, maxs = 1, self.signal, self.signal
+        for level in self.levels:
+            if level[0] > per_pixel:
+                break
+            factor, mins, maxs = level
+        start = first // factor
+        stop = -(-last // factor)
+        bounds = np.unique(np.linspace(start, stop, pixels + 1).astype(int))
+        column_min = np.minimum.reduceat(mins[start:stop], bounds[:-1] - start)
+        column_max = np.maximum.reduceat(maxs[start:stop], bounds[:-1] - start)
+
+        centers = self.x0 + (bounds[:-1] + bounds[1:]) / 2 * factor * self.dx
+        x = np.repeat(centers, 2)
+        y = np.empty(2 * len(column_min), np.result_type(column_min))
+        y[0::2] = column_min
+        y[1::2] = column_max
+        return x, y
+
+
+# Línea de matplotlib dibujada desde una pirámide: se recalcula al cambiar los límites del eje
+# (zoom o desplazamiento), con tantos puntos como píxeles tenga el eje.
+# Los callbacks de matplotlib guardan los métodos con referencias débiles: la línea guarda al
+# LODLine para que viva mientras esté en el eje aunque quien la creó no lo conserve
+class LODLine:
+    def __init__(self, ax, pyramid, **kwargs):
+        self.ax = ax
+        self.pyramid = pyramid
+        x, y = pyramid.envelope(*pyramid.extent, self.pixels())
+        self.line, = ax.plot(x, y, **kwargs)
+        self.line._lod = self
+        self.callback = ax.callbacks.connect('xlim_changed', self.update)
+
+    def pixels(self):
+        width = int(self.ax.get_window_extent().width)
+        return width if width > 0 else DEFAULT_PIXELS
+
+    def update(self, ax=None):
+        x, y = self.pyramid.envelope(*self.ax.get_xlim(), self.pixels())
+        self.line.set_data(x, y)
+
+    def remove(self):
+        self.ax.callbacks.disconnect(self.callback)
+        self.line.remove()
+        del self.line._lod
+
+
+# Reemplazo de ax.plot(t, signal) para señales largas muestreadas a fs
+def plot_lod(ax, signal, fs, start=0.0, **kwargs):
+    return LODLine(ax, MinMaxPyramid(signal, start, 1 / fs), **kwargs)
@@ -0,0 +1,88 @@
+import numpy as np
+from functools import lru_cache
+from math import gcd, lcm
+from precision import complex_dtype, float_dtype
+
+# Períodos más largos que esto no se tabulan (fc/fs no racional con denominador chico)
+MAX_TABLE_LENGTH = 1 << 16
+
+
+# Período exacto en muestras de cos(2*pi*fc*n/fs), o None si no conviene tabularlo
+def carrier_period(fc, fs):
+    if not (float(fc).is_integer() and float(fs).is_integer()):
+        return None
+    period = int(fs) // gcd(int(fc), int(fs))
+    return period if period <= MAX_TABLE_LENGTH else None
+
+# Un período común de todas las portadoras, una fila por portadora.
+# Con analytic=True la tabla es exp(j 2 pi fc n / fs) en lugar del coseno.
+# Se calcula en float64 y se redondea al tipo pedido
+@lru_cache(maxsize=32)
+def carrier_table(carriers, fs, analytic=False, dtype='float64'):
+    periods = [carrier_period(fc, fs) for fc in carriers]
+    if None in periods:
+        return None
+    period = lcm(*periods)
+    if period > MAX_TABLE_LENGTH:
+        return None
+    # Fase calculada con aritmética entera para que la tabla sea exacta
+    n = np.arange(period, dtype=np.int64)
+    phase = np.outer(np.asarray(carriers, dtype=np.int64), n) % int(fs)
+    if analytic:
+        return np.exp(2j * np.pi * phase / fs).astype(complex_dtype(dtype))
+    return np.cos(2 * np.pi * phase / fs).astype(dtype)
+
+# Repite la tabla a lo largo del último eje duplicando el tramo ya copiado
+def tile_table(table, length, out):
+    n = min(table.shape[-1], length)
+    out[..., :n] = table[..., :n]
+    while n < length:
+        m = min(n, length - n)
+        out[..., n:n + m] = out[..., :m]
+        n += m
+    return out
+
+# Portadora(s) de `length` muestras empezando en la muestra `start`; fc escalar o arreglo.
+# Con out se escribe ahí (y se usa su precisión); si no, se crea un arreglo del tipo dtype
+def carrier_wave(fc, fs, length, start=0, out=None, analytic=False, dtype=None):
+    carriers = np.atleast_1d(fc)
+    scalar = np.ndim(fc) == 0
+    if out is None:
+        dtype = complex_dtype(dtype) if analytic else float_dtype(dtype)
+        out = np.empty(length, dtype) if scalar else np.empty((len(carriers), length), dtype)
+    rows = out[np.newaxis] if scalar else out
+    table = carrier_table(tuple(carriers.tolist()), fs, analytic, float_dtype(np.finfo(out.dtype).dtype))
+    if table is None:
+        n = start + np.arange(length)
+        phase = 2 * np.pi * carriers[:, np.newaxis] / fs * n
+        rows[...] = np.exp(1j * phase) if analytic else np.cos(phase)
+    else:
+        offset = start % table.shape[-1]
+        tile_table(np.roll(table, -offset, axis=-1), length, rows)
+    return out
+
+
+# Oscilador controlado numéricamente: conserva la fase entre llamadas
+class NCO:
+    def __init__(self, fc, fs, analytic=False, dtype=None):
+        self.fc = fc
+        self.fs = fs
+        self.analytic = analytic
+        self.dtype = float_dtype(dtype)
+        self.position = 0
+        table = carrier_table(tuple(np.atleast_1d(fc).tolist()), fs, analytic, self.dtype)
+        self.period = None if table is None else table.shape[-1]
+
+    def next(self, length, out=None):
+        carrier = carrier_wave(self.fc, self.fs, length, self.position, out, self.analytic, self.dtype)
+        self.advance(length)
+        return carrier
+
+    # Avanza la fase sin generar muestras (si la portadora se generó por otro lado)
+    def advance(self, length):
+        self.position += length
+        if self.period is not None:
+            self.position %= self.period
+
+    def reset(self):
+        self.position = 0
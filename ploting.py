@@ -1,58 +1,106 @@
-import numpy as np
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from lod import plot_lod
+from spectrum import signal_spectrum
 
+FIGURE_SIZE = (10, 10)
+# Los procesos de save_plots no heredan el estado de Tk ni los hilos de audio del proceso
+# principal: se crean desde un servidor limpio (forkserver) o con spawn donde no hay
+PLOT_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
 
-def plot_spectrum_and_time(signal, fs, title, save=False, filename=None):
-    n = len(signal)
-    t = np.arange(n) / fs
-    k = np.arange(n)
-    T = n / fs
-    frq = k / T
-    frq = frq[range(n//2)]
-    Y = np.fft.fft(signal) / n
-    Y = Y[range(n//2)]
-    
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 10))
-    
-    ax1.plot(t, signal)
+
+# Dibuja las dos vistas (tiempo y espectro ya calculado) en una figura de dos ejes
+def draw_spectrum_and_time(fig, signal, fs, title, frq, Y):
+    ax1, ax2 = fig.subplots(2, 1)
+
+    # Envolvente min/max por píxel: el costo depende del ancho del eje, no del largo de la señal
+    plot_lod(ax1, signal, fs)
     ax1.set_title(f'{title} - Time Domain')
     ax1.set_xlabel('Time (s)')
     ax1.set_ylabel('Amplitude')
-    
-    ax2.plot(frq, abs(Y))
+
+    # El espectro está muestreado cada frq[1] Hz
+    plot_lod(ax2, Y, 1 / frq[1])
     ax2.set_title(f'{title} - Frequency Domain')
     ax2.set_xlabel('Frequency (Hz)')
     ax2.set_ylabel('Amplitude')
-    
-    plt.tight_layout()
-    
+
+    fig.tight_layout()
+
+# spectrum='fft' grafica el espectro completo, 'welch' el promediado (para señales largas)
+def plot_spectrum_and_time(signal, fs, title, save=False, filename=None, spectrum='fft'):
+    # Las señales en banda base compleja se pasan a reales recién al graficar
+    if hasattr(signal, 'to_real'):
+        signal = signal.to_real()
+    # Memoizado: graficar y después guardar la misma señal calcula la transformada una sola vez
+    frq, Y = signal_spectrum(signal, fs, spectrum)
+
+    fig = plt.figure(figsize=FIGURE_SIZE)
+    draw_spectrum_and_time(fig, signal, fs, title, frq, Y)
+
     if save and filename:
-        plt.savefig(filename)
+        fig.savefig(filename)
+        plt.close(fig)
     else:
         plt.show()
 
-def plot_signals(signals, fs, fs_multiplexed):
-
-    plot_spectrum_and_time(signals.get("Original A"), fs, 'Señal original "a"')
-    plot_spectrum_and_time(signals["Conditioned A"], 8000, 'Señal acondicionada "a"')
-    plot_spectrum_and_time(signals["Original E"], fs, 'Señal original "e"')
-    plot_spectrum_and_time(signals["Conditioned E"], 8000, 'Señal acondicionada "e"')
-    plot_spectrum_and_time(signals["Original I"], fs, 'Señal original "i"')
-    plot_spectrum_and_time(signals["Conditioned I"], 8000, 'Señal acondicionada "i"')
-    plot_spectrum_and_time(signals["Multiplexed"], fs_multiplexed, 'Señal multiplexada')
-    plot_spectrum_and_time(signals["Processed A"], 8000, 'Señal demultiplexada "a"')
-    plot_spectrum_and_time(signals["Processed E"], 8000, 'Señal demultiplexada "e"')
-    plot_spectrum_and_time(signals["Processed I"], 8000, 'Señal demultiplexada "i"')
-
-def save_plots(signals, fs, fs_multiplexed):
-
-    plot_spectrum_and_time(signals.get("Original A"), fs, 'Señal original "a"', save=True, filename='./images/original_a.png')
-    plot_spectrum_and_time(signals["Conditioned A"], 8000, 'Señal acondicionada "a"', save=True, filename='./images/processed_a.png')
-    plot_spectrum_and_time(signals["Original E"], fs, 'Señal original "e"', save=True, filename='./images/original_e.png')
-    plot_spectrum_and_time(signals["Conditioned E"], 8000, 'Señal acondicionada "e"', save=True, filename='./images/processed_e.png')
-    plot_spectrum_and_time(signals["Original I"], fs, 'Señal original "i"', save=True, filename='./images/original_i.png')
-    plot_spectrum_and_time(signals["Conditioned I"], 8000, 'Señal acondicionada "i"', save=True, filename='./images/processed_i.png')
-    plot_spectrum_and_time(signals["Multiplexed"], fs_multiplexed, 'Señal multiplexada', save=True, filename='./images/multiplexed.png')
-    plot_spectrum_and_time(signals["Processed A"], 8000, 'Señal demultiplexada "a"', save=True, filename='./images/demux_a.png')
-    plot_spectrum_and_time(signals["Processed E"], 8000, 'Señal demultiplexada "e"', save=True, filename='./images/demux_e.png')
-    plot_spectrum_and_time(signals["Processed I"], 8000, 'Señal demultiplexada "i"', save=True, filename='./images/demux_i.png')
\ No newline at end of file
+# PNG con Agg y una Figure suelta (sin pyplot): no queda registrada en ningún lado y se libera
+# al terminar, así la memoria no crece con la cantidad de gráficos
+def render_png(filename, signal, fs, title, frq, Y):
+    fig = Figure(figsize=FIGURE_SIZE)
+    FigureCanvasAgg(fig)
+    draw_spectrum_and_time(fig, signal, fs, title, frq, Y)
+    fig.savefig(filename)
+    fig.clear()
+    return filename
+
+def plot_signals(signals, fs, fs_multiplexed, spectrum='fft'):
+
+    plot_spectrum_and_time(signals.get("Original A"), fs, 'Señal original "a"', spectrum=spectrum)
+    plot_spectrum_and_time(signals["Conditioned A"], 8000, 'Señal acondicionada "a"', spectrum=spectrum)
+    plot_spectrum_and_time(signals["Original E"], fs, 'Señal original "e"', spectrum=spectrum)
+    plot_spectrum_and_time(signals["Conditioned E"], 8000, 'Señal acondicionada "e"', spectrum=spectrum)
+    plot_spectrum_and_time(signals["Original I"], fs, 'Señal original "i"', spectrum=spectrum)
+    plot_spectrum_and_time(signals["Conditioned I"], 8000, 'Señal acondicionada "i"', spectrum=spectrum)
+    plot_spectrum_and_time(signals["Multiplexed"], fs_multiplexed, 'Señal multiplexada', spectrum=spectrum)
+    plot_spectrum_and_time(signals["Processed A"], 8000, 'Señal demultiplexada "a"', spectrum=spectrum)
+    plot_spectrum_and_time(signals["Processed E"], 8000, 'Señal demultiplexada "e"', spectrum=spectrum)
+    plot_spectrum_and_time(signals["Processed I"], 8000, 'Señal demultiplexada "i"', spectrum=spectrum)
+
+# Figuras de save_plots: (clave en signals, fs, título, archivo)
+def _save_plot_jobs(fs, fs_multiplexed):
+    return [
+        ("Original A", fs, 'Señal original "a"', 'original_a.png'),
+        ("Conditioned A", 8000, 'Señal acondicionada "a"', 'processed_a.png'),
+        ("Original E", fs, 'Señal original "e"', 'original_e.png'),
+        ("Conditioned E", 8000, 'Señal acondicionada "e"', 'processed_e.png'),
+        ("Original I", fs, 'Señal original "i"', 'original_i.png'),
+        ("Conditioned I", 8000, 'Señal acondicionada "i"', 'processed_i.png'),
+        ("Multiplexed", fs_multiplexed, 'Señal multiplexada', 'multiplexed.png'),
+        ("Processed A", 8000, 'Señal demultiplexada "a"', 'demux_a.png'),
+        ("Processed E", 8000, 'Señal demultiplexada "e"', 'demux_e.png'),
+        ("Processed I", 8000, 'Señal demultiplexada "i"', 'demux_i.png'),
+    ]
+
+# Guarda los diez PNG. Los espectros se piden en este proceso (memoizados: si ya se graficó no
+# se recalculan) y el dibujo con Agg se reparte en un pool de `workers` procesos
+# (por defecto uno por núcleo; con workers=1 se dibuja acá mismo, uno por vez)
+def save_plots(signals, fs, fs_multiplexed, spectrum='fft', workers=None, directory='./images'):
+    os.makedirs(directory, exist_ok=True)
+    jobs = []
+    for key, rate, title, name in _save_plot_jobs(fs, fs_multiplexed):
+        signal = signals[key]
+        if hasattr(signal, 'to_real'):
+            signal = signal.to_real()
+        frq, Y = signal_spectrum(signal, rate, spectrum)
+        jobs.append((os.path.join(directory, name), signal, rate, title, frq, Y))
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        return [render_png(*job) for job in jobs]
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(PLOT_START_METHOD)) as executor:
+        return list(executor.map(render_png, *zip(*jobs)))
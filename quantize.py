@@ -0,0 +1,61 @@
+import numpy as np
+
+# Piso de la envolvente del AGC respecto del fondo de escala de la entrada: limita la ganancia
+# para que las pausas y el ruido de fondo no suban hasta escala completa
+AGC_FLOOR_DB = -30.0
+
+
+# Fondo de escala de muestras de este tipo: 32768 para int16, 2**31 para int32, 128 para los
+# WAV de 8 bits (sin signo) y 1.0 para los flotantes, que read_wav devuelve sin convertir
+def sample_full_scale(dtype):
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'i':
+        return float(np.iinfo(dtype).max + 1)
+    if dtype.kind == 'u':
+        return float((np.iinfo(dtype).max + 1) // 2)
+    return 1.0
+
+# Piso del AGC (AGC_FLOOR_DB) en las unidades de una entrada con ese fondo de escala
+def agc_floor(full_scale=1.0):
+    return full_scale * 10 ** (AGC_FLOOR_DB / 20)
+
+
+# Cuantización a 8 bits con el pico acumulado por canal hasta el bloque actual
+class RunningPeakQuantizer:
+    def __init__(self):
+        self.peak = None
+
+    def process(self, block):
+        block_peak = np.max(np.abs(block), axis=-1, keepdims=True, initial=0)
+        self.peak = block_peak if self.peak is None else np.maximum(self.peak, block_peak)
+        scale = np.divide(127, self.peak, out=np.zeros_like(self.peak, dtype=float), where=self.peak > 0)
+        return np.int8(block * scale)
+
+
+# Control automático de ganancia para la cuantización a 8 bits: la envolvente de pico sube
+# en el mismo bloque (ataque instantáneo, sin recortes) y cae exponencialmente con la
+# constante `release` (segundos). La ganancia se interpola a lo largo de cada bloque para que
+# no salte entre bloques. `floor` evita llevar el silencio a escala completa (0 lo desactiva);
+# por defecto es agc_floor(full_scale), con full_scale el fondo de escala de la entrada
+class AGCQuantizer:
+    def __init__(self, fs, release=0.5, floor=None, full_scale=1.0):
+        self.release_rate = 1.0 / (release * fs)
+        self.floor = agc_floor(full_scale) if floor is None else floor
+        self.envelope = None
+        self.gain = None
+
+    def process(self, block):
+        length = block.shape[-1]
+        block_peak = np.max(np.abs(block), axis=-1, keepdims=True, initial=self.floor)
+        if self.envelope is None:
+            self.envelope = block_peak
+        else:
+            decayed = self.envelope * np.exp(-length * self.release_rate)
+            self.envelope = np.maximum(decayed, block_peak)
+        gain = np.divide(127, self.envelope, out=np.zeros_like(self.envelope, dtype=float),
+                         where=self.envelope > 0)
+        # Al bajar la ganancia se aplica de inmediato; al subirla se hace en rampa
+        start = gain if self.gain is None else np.minimum(self.gain, gain)
+        ramp = start + (gain - start) * (np.arange(1, length + 1) / length)
+        self.gain = gain
+        return np.int8(np.clip(block * ramp, -127, 127))
@@ -0,0 +1,155 @@
+import time
+import threading
+import numpy as np
+import sounddevice as sd
+from filters import bandpass_sos, kaiser_lowpass_taps
+from precision import float_dtype
+from ringbuffer import RingBuffer
+from quantize import AGCQuantizer, sample_full_scale
+from streaming import BlockSOSFilter, BlockDecimator
+
+# Bloque por defecto: 10 ms a 24 KHz (múltiplo del factor de decimación)
+DEFAULT_BLOCK_SIZE = 240
+# Latencia total objetivo (entrada + procesamiento + salida) en segundos
+DEFAULT_LATENCY_BUDGET = 0.05
+# Capacidad de los buffers circulares del modo con hilo de procesamiento, en bloques
+RING_BLOCKS = 16
+# Historia de los buffers que alimentan la vista en vivo, en segundos
+MONITOR_SECONDS = 1.0
+
+
+# Motor en tiempo real full-duplex: el callback de sd.Stream recibe cada bloque del micrófono,
+# aplica pasa banda, remuestreo a fs_new y cuantización a 8 bits con AGC (con estado entre bloques)
+# y devuelve el resultado por la salida, sin huecos entre bloques ni hilos de sondeo.
+# Con worker=True el callback sólo copia muestras a/desde buffers circulares preasignados y
+# el procesamiento corre en un hilo aparte (suma un bloque de latencia a cambio de margen).
+# Con monitor=True cada bloque de entrada (int16 a fs) y su versión acondicionada (int8 a fs_new)
+# se copian además a buffers circulares que lee la vista en vivo (liveview.py) a su ritmo
+# La entrada es siempre int16: agc_floor está en esas unidades (por defecto -30 dBFS)
+class RealTimeEngine:
+    def __init__(self, fs=24000, fs_new=8000, block_size=DEFAULT_BLOCK_SIZE,
+                 latency_budget=DEFAULT_LATENCY_BUDGET, lowcut=300.0, highcut=3400.0, device=None,
+                 worker=False, agc_release=0.5, agc_floor=None, dtype=None, monitor=False):
+        self.decimation_factor = int(fs / fs_new)
+        if block_size % self.decimation_factor:
+            raise ValueError(f"El tamaño de bloque debe ser múltiplo de {self.decimation_factor}")
+        self.fs = fs
+        self.fs_new = fs_new
+        self.block_size = block_size
+        self.latency_budget = latency_budget
+        self.device = device
+        self.dtype = float_dtype(dtype)
+
+        self.input_filter = BlockSOSFilter(bandpass_sos(lowcut, highcut, fs, dtype=dtype))
+        self.decimator = BlockDecimator(kaiser_lowpass_taps(fs_new / 2, fs, dtype=dtype), self.decimation_factor)
+        self.quantizer = AGCQuantizer(fs_new, release=agc_release, floor=agc_floor,
+                                      full_scale=sample_full_scale(np.int16))
+
+        self.worker = worker
+        self.input_ring = RingBuffer(RING_BLOCKS * block_size, np.int16)
+        self.output_ring = RingBuffer(RING_BLOCKS * block_size, np.int16)
+        self.worker_thread = None
+        self.running = False
+
+        self.monitor_input = RingBuffer(int(MONITOR_SECONDS * fs), np.int16) if monitor else None
+        self.monitor_output = RingBuffer(int(MONITOR_SECONDS * fs_new), np.int8) if monitor else None
+
+        self.stream = None
+        self.blocks = 0
+        self.xruns = 0
+        self.late_callbacks = 0
+        self.max_callback_time = 0.0
+
+    @property
+    def block_duration(self):
+        return self.block_size / self.fs
+
+    # Latencia estimada: la informada por el dispositivo más los bloques de procesamiento
+    @property
+    def latency(self):
+        if self.stream is None:
+            return None
+        input_latency, output_latency = self.stream.latency
+        return input_latency + output_latency + self.processing_blocks * self.block_duration
+
+    @property
+    def processing_blocks(self):
+        return 2 if self.worker else 1
+
+    def process(self, block):
+        filtered = self.input_filter.process(block)
+        resampled = self.decimator.process(filtered)
+        return self.quantizer.process(resampled)
+
+    # Se escucha a fs_new: cada muestra de 8 bits se repite hasta volver a fs
+    def render(self, block, out):
+        quantized = self.process(block.astype(self.dtype))
+        if self.monitor_input is not None:
+            # Sólo copias: si la vista se atrasa se pisan las muestras más viejas
+            self.monitor_input.write(block)
+            self.monitor_output.write(quantized)
+        out[:] = np.repeat(quantized.astype(np.int16) << 8, self.decimation_factor)[:len(out)]
+
+    def callback(self, indata, outdata, frames, time_info, status):
+        start = time.perf_counter()
+        if status:
+            self.xruns += 1
+        if self.worker:
+            self.input_ring.write(indata[:, 0])
+            self.output_ring.read_available_into(outdata[:, 0])
+        else:
+            self.render(indata[:, 0], outdata[:, 0])
+        self.blocks += 1
+        elapsed = time.perf_counter() - start
+        self.max_callback_time = max(self.max_callback_time, elapsed)
+        if elapsed > self.block_duration:
+            self.late_callbacks += 1
+
+    def start(self):
+        if self.stream is not None:
+            return
+        # Cada bloque suma su duración de entrada y de salida a la latencia
+        half_budget = self.latency_budget / 2
+        processing_time = self.processing_blocks * self.block_duration
+        if processing_time > half_budget:
+            raise ValueError(f"{self.processing_blocks} bloque(s) de {self.block_duration * 1000:.1f} ms no entran "
+                             f"en la latencia objetivo de {self.latency_budget * 1000:.1f} ms")
+        if self.monitor_input is not None:
+            self.monitor_input.clear()
+            self.monitor_output.clear()
+        if self.worker:
+            self.input_ring.clear()
+            self.output_ring.clear()
+            # Un bloque de silencio de margen para que el hilo alcance al callback
+            self.output_ring.write(np.zeros(self.block_size, np.int16))
+            self.running = True
+            self.worker_thread = threading.Thread(target=self.process_loop, daemon=True)
+            self.worker_thread.start()
+        self.stream = sd.Stream(samplerate=self.fs, blocksize=self.block_size, channels=1, dtype='int16',
+                                latency=half_budget - processing_time, device=self.device,
+                                callback=self.callback)
+        self.stream.start()
+        if self.latency > self.latency_budget:
+            print(f"Advertencia: latencia de {self.latency * 1000:.1f} ms, "
+                  f"por encima del objetivo de {self.latency_budget * 1000:.1f} ms")
+
+    # Hilo de procesamiento: espera bloques completos en el buffer de entrada (sin sondeo)
+    def process_loop(self):
+        block = np.empty(self.block_size, np.int16)
+        out = np.empty(self.block_size, np.int16)
+        while self.running:
+            if not self.input_ring.read_into(block, timeout=0.1):
+                continue
+            self.render(block, out)
+            self.output_ring.write(out)
+
+    def stop(self):
+        if self.stream is None:
+            return
+        self.stream.stop()
+        self.stream.close()
+        self.stream = None
+        if self.worker_thread is not None:
+            self.running = False
+            self.worker_thread.join()
+            self.worker_thread = None
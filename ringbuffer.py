@@ -0,0 +1,100 @@
+import threading
+import numpy as np
+
+
+# Buffer circular de capacidad fija y memoria preasignada para pasar muestras entre hilos.
+# Escribir y leer copian dentro del arreglo propio (o devuelven vistas), sin crear objetos
+# por bloque. Si el productor se adelanta se descartan las muestras más viejas (overrun);
+# si el consumidor no encuentra datos completa con ceros (underrun)
+class RingBuffer:
+    def __init__(self, capacity, dtype=np.float32):
+        self.buffer = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.read_count = 0
+        self.write_count = 0
+        self.overruns = 0
+        self.underruns = 0
+        self.condition = threading.Condition()
+
+    def available(self):
+        return self.write_count - self.read_count
+
+    def free(self):
+        return self.capacity - self.available()
+
+    # Las (a lo sumo dos) vistas contiguas que cubren [start, start + n) en el arreglo
+    def _views(self, start, n):
+        first = start % self.capacity
+        end = min(first + n, self.capacity)
+        return self.buffer[first:end], self.buffer[:n - (end - first)]
+
+    def write(self, data):
+        n = len(data)
+        with self.condition:
+            if n > self.capacity:
+                # Sólo entran las últimas `capacity` muestras; las anteriores se pierden
+                skipped = n - self.capacity
+                data = data[skipped:]
+                self.write_count += skipped
+                n = self.capacity
+            if n > self.free():
+                self.overruns += 1
+                self.read_count = self.write_count + n - self.capacity
+            head, tail = self._views(self.write_count, n)
+            head[:] = data[:len(head)]
+            tail[:] = data[len(head):]
+            self.write_count += n
+            self.condition.notify_all()
+
+    # Espera hasta que haya n muestras (o hasta el timeout); True si las hay
+    def wait(self, n, timeout=None):
+        with self.condition:
+            return self.condition.wait_for(lambda: self.available() >= n, timeout)
+
+    # Vistas de las próximas n muestras sin consumirlas; luego llamar a consume(n)
+    def peek(self, n):
+        with self.condition:
+            return self._views(self.read_count, min(n, self.available()))
+
+    def consume(self, n):
+        with self.condition:
+            self.read_count += min(n, self.available())
+
+    # Copia len(out) muestras en out, bloqueando hasta que estén disponibles
+    def read_into(self, out, timeout=None):
+        if not self.wait(len(out), timeout):
+            return False
+        with self.condition:
+            head, tail = self._views(self.read_count, len(out))
+            out[:len(head)] = head
+            out[len(head):] = tail
+            self.read_count += len(out)
+        return True
+
+    # Versión sin bloqueo para callbacks de audio: lo que falte se rellena con ceros
+    def read_available_into(self, out):
+        with self.condition:
+            n = min(len(out), self.available())
+            head, tail = self._views(self.read_count, n)
+            out[:len(head)] = head
+            out[len(head):n] = tail
+            if n < len(out):
+                out[n:] = 0
+                self.underruns += 1
+            self.read_count += n
+        return n
+
+    # Copia lo que haya (a lo sumo len(out) muestras) sin bloquear ni rellenar; devuelve cuántas.
+    # Para lectores que no marcan el ritmo, como la vista en vivo
+    def drain_into(self, out):
+        with self.condition:
+            n = min(len(out), self.available())
+            head, tail = self._views(self.read_count, n)
+            out[:len(head)] = head
+            out[len(head):n] = tail
+            self.read_count += n
+        return n
+
+    def clear(self):
+        with self.condition:
+            self.read_count = self.write_count
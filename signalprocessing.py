@@ -1,82 +1,319 @@
 import numpy as np
 import scipy.signal as sig
-from tkinter import messagebox
-from filters import improved_bandpass_filter
+from concurrent.futures import ThreadPoolExecutor
+from filters import hann_window, improved_bandpass_filter, kaiser_lowpass_taps
+from nco import carrier_wave
+from channelizer import demultiplex_channelizer
+from fftmux import multiplex_fft
+from baseband import BasebandSignal, baseband_plan
+from quantize import AGCQuantizer, sample_full_scale
+from instrumentation import stage
+from precision import as_float, float_dtype
 
 
-def modulate(signal, fc, fs):
-    t = np.arange(len(signal)) / fs
-    window = sig.windows.hann(len(t))
-    return signal * np.cos(2 * np.pi * fc * t) * window
+# Portadoras por defecto para las tres vocales
+DEFAULT_CARRIERS = (62000, 66000, 70000)
+# Bloque del AGC en modo archivo completo: 20 ms a 8 KHz
+AGC_BLOCK_SIZE = 160
 
-def demodulate(signal, fc, fs):
-    t = np.arange(len(signal)) / fs
-    window = sig.windows.hann(len(t))
-    demodulated = signal * np.cos(2 * np.pi * fc * t) * window
-    return improved_bandpass_filter(demodulated, 300, 3400, fs)
 
-def process_signals(a_signal, e_signal, i_signal, fs):
+# Menor fs multiplexada (múltiplo de fs_new y al menos 192 KHz) que contiene todas las portadoras
+def multiplexed_rate(carriers, fs_new=8000, min_fs_multiplexed=192000):
+    fs_needed = 2 * (max(carriers) + fs_new / 2)
+    return max(min_fs_multiplexed, int(np.ceil(fs_needed / fs_new)) * fs_new)
 
-    if a_signal is None or e_signal is None or i_signal is None:
-        messagebox.showerror("Error", "Debe grabar todas las señales primero.")
-        return
+# Portadoras separadas 4 KHz a partir de 62 KHz
+def carrier_plan(n_channels, fs_new=8000, first_carrier=62000, spacing=4000):
+    carriers = tuple(first_carrier + k * spacing for k in range(n_channels))
+    return carriers, multiplexed_rate(carriers, fs_new)
 
-    lowcut = 300.0
-    highcut = 3400.0
-    a_filtered = improved_bandpass_filter(a_signal, lowcut, highcut, fs)
-    e_filtered = improved_bandpass_filter(e_signal, lowcut, highcut, fs)
-    i_filtered = improved_bandpass_filter(i_signal, lowcut, highcut, fs)
+# Apila las señales en un arreglo 2-D (canales x muestras), rellenando con ceros las más cortas
+def stack_signals(signals):
+    if isinstance(signals, np.ndarray) and signals.ndim == 2:
+        return signals
+    length = max(len(s) for s in signals)
+    stacked = np.zeros((len(signals), length), dtype=np.result_type(*signals))
+    for k, s in enumerate(signals):
+        stacked[k, :len(s)] = s
+    return stacked
 
-    fs_new = 8000
-    decimation_factor = int(fs / fs_new)
-    
-    nyq = 0.5 * fs
-    cutoff = fs_new / 2
-    N, beta = sig.kaiserord(60, width=(fs_new/2)/nyq)
-    taps = sig.firwin(N, cutoff, window=('kaiser', beta), scale=True, nyq=nyq)
+# Producto señal * portadora * ventana de Hann escrito en out (se crea si no se pasa), sin
+# temporarios: la portadora se genera directamente en out y se multiplica in-place.
+# fc puede ser un escalar o un arreglo con una portadora por fila de la señal.
+# dtype (float64 por defecto o float32) es el tipo de la portadora, la ventana y el resultado.
+# window permite pasar la ventana ya armada (las largas no se memoizan, ver filters.hann_window)
+def mix(signal, fc, fs, dtype=None, out=None, window=None):
+    length = signal.shape[-1]
+    carrier_shape = (length,) if np.ndim(fc) == 0 else (len(fc), length)
+    shape = np.broadcast_shapes(signal.shape, carrier_shape)
+    if out is None:
+        out = np.empty(shape, np.result_type(signal.dtype, float_dtype(dtype)))
+    if shape == carrier_shape:
+        carrier_wave(fc, fs, length, out=out)
+        out *= signal
+    else:
+        np.multiply(signal, carrier_wave(fc, fs, length, dtype=dtype), out=out)
+    out *= hann_window(length, dtype) if window is None else window
+    return out
+
+def modulate(signal, fc, fs, dtype=None, out=None):
+    return mix(signal, fc, fs, dtype, out)
+
+# Suma de los canales modulados (una fila por portadora) acumulada fila a fila: sólo usa
+# un buffer de trabajo de una fila (work) en lugar de un arreglo canales x muestras
+def modulate_sum(signal, carriers, fs, dtype=None, out=None, work=None):
+    length = signal.shape[-1]
+    result_dtype = np.result_type(signal.dtype, float_dtype(dtype))
+    if out is None:
+        out = np.zeros(length, result_dtype)
+    else:
+        out[...] = 0
+    if work is None:
+        work = np.empty(length, result_dtype)
+    window = hann_window(length, dtype)
+    for row, fc in zip(signal, carriers):
+        out += mix(row, fc, fs, dtype, work, window)
+    return out
 
-    a_resampled = sig.resample_poly(a_filtered, 1, decimation_factor, window=taps)
-    e_resampled = sig.resample_poly(e_filtered, 1, decimation_factor, window=taps)
-    i_resampled = sig.resample_poly(i_filtered, 1, decimation_factor, window=taps)
+# out es el buffer de la mezcla (canales x muestras); el pasa banda devuelve un arreglo nuevo
+def demodulate(signal, fc, fs, dtype=None, out=None):
+    demodulated = mix(signal, fc, fs, dtype, out)
+    return improved_bandpass_filter(demodulated, 300, 3400, fs, dtype=dtype)
 
-    a_resampled_8bit = np.int8(a_resampled / np.max(np.abs(a_resampled)) * 127)
-    e_resampled_8bit = np.int8(e_resampled / np.max(np.abs(e_resampled)) * 127)
-    i_resampled_8bit = np.int8(i_resampled / np.max(np.abs(i_resampled)) * 127)
+# Factores de decimación por etapa, primero los mayores (ej. 24 -> 4, 3, 2)
+def decimation_stages(factor):
+    stages = []
+    for step in (4, 3, 2):
+        while factor % step == 0:
+            stages.append(step)
+            factor //= step
+    if factor > 1:
+        stages.append(factor)
+    return stages
 
-    processed_a = a_resampled_8bit
-    processed_e = e_resampled_8bit
-    processed_i = i_resampled_8bit
+# Decimación en varias etapas cortas: cada filtro sólo protege la banda [0, passband]
+# del aliasing de la etapa, así las primeras etapas tienen transiciones anchas y pocos taps
+def decimate_multistage(signal, factor, fs, passband=3400.0, dtype=None):
+    rate = fs
+    if not np.iscomplexobj(signal):
+        signal = as_float(signal, dtype)
+    for step in decimation_stages(factor):
+        stopband = rate / step - passband
+        taps = kaiser_lowpass_taps((passband + stopband) / 2, rate, width=stopband - passband, odd=True,
+                                   dtype=dtype)
+        signal = sig.resample_poly(signal, 1, step, window=taps, axis=-1)
+        rate //= step
+    return signal
 
-    fc1, fc2, fc3 = 62000, 66000, 70000
+# Interpolación en varias etapas, empezando por la de menor factor a la fs más baja
+# (ej. 24 -> 2, 3, 4): el primer filtro es de media banda y los siguientes, con
+# transiciones anchas, sólo tienen que borrar las imágenes de su propia etapa
+def interpolate_multistage(signal, factor, fs, passband=3400.0, dtype=None):
+    rate = fs
+    signal = as_float(signal, dtype)
+    for step in reversed(decimation_stages(factor)):
+        stopband = rate - passband
+        taps = kaiser_lowpass_taps((passband + stopband) / 2, rate * step, width=stopband - passband, odd=True,
+                                   dtype=dtype)
+        signal = sig.resample_poly(signal, step, 1, window=taps, axis=-1)
+        rate *= step
+    return signal
 
-    fs_multiplexed = 192000
+# Demodulación que decima antes de filtrar: mezcla, baja a fs_new en etapas y recién ahí limita la banda
+def demodulate_decimated(signal, fc, fs, fs_new=8000, lowcut=300.0, highcut=3400.0, dtype=None):
+    mixed = mix(signal, fc, fs, dtype)
+    baseband = decimate_multistage(mixed, fs // fs_new, fs, highcut, dtype)
+    return improved_bandpass_filter(baseband, lowcut, highcut, fs_new, dtype=dtype)
+
+# Cuantización a 8 bits en una sola pasada con AGC, bloque a bloque
+def quantize_agc(signal, fs, block_size=AGC_BLOCK_SIZE, release=0.5, floor=None, full_scale=1.0):
+    quantizer = AGCQuantizer(fs, release, floor, full_scale)
+    quantized = np.empty(signal.shape, dtype=np.int8)
+    for start in range(0, signal.shape[-1], block_size):
+        quantized[..., start:start + block_size] = quantizer.process(signal[..., start:start + block_size])
+    return quantized
+
+# Acondicionamiento: pasa banda, remuestreo a fs_new y cuantización a 8 bits por canal.
+# quantizer='peak' normaliza por el máximo de toda la señal, quantizer='agc' usa AGC por bloques
+# con el piso relativo al fondo de escala de la entrada (por defecto, el de su tipo: int16, float...)
+def condition_channels(channels, fs, fs_new=8000, lowcut=300.0, highcut=3400.0, quantizer='peak', dtype=None,
+                       full_scale=None):
+    if full_scale is None:
+        full_scale = sample_full_scale(np.asarray(channels).dtype)
+    with stage('bandpass', channels) as s:
+        filtered = improved_bandpass_filter(channels, lowcut, highcut, fs, dtype=dtype)
+        s.output(filtered)
+    with stage('resample', filtered) as s:
+        decimation_factor = int(fs / fs_new)
+        taps = kaiser_lowpass_taps(fs_new / 2, fs, dtype=dtype)
+        resampled = sig.resample_poly(filtered, 1, decimation_factor, window=taps, axis=-1)
+        s.output(resampled)
+    with stage('quantize', resampled) as s:
+        if quantizer == 'peak':
+            quantized = np.int8(resampled / np.max(np.abs(resampled), axis=-1, keepdims=True) * 127)
+        elif quantizer == 'agc':
+            quantized = quantize_agc(resampled, fs_new, full_scale=full_scale)
+        else:
+            raise ValueError(f"Cuantizador desconocido: {quantizer}")
+        s.output(quantized)
+    return quantized
+
+# Suma de los canales modulados. mux='time' sobremuestrea y modula en el tiempo, mux='fft' arma
+# todo el espectro con una irfft. upsample='repeat' (retención de orden cero) o 'multistage'
+# (interpolación FIR en etapas) para mux='time'
+def multiplex_channels(processed, carriers, fs_multiplexed, fs_new=8000, mux='time', upsample='repeat',
+                       highcut=3400.0, dtype=None):
     upsample_factor = fs_multiplexed // fs_new
-    
-    a_upsampled = np.repeat(a_resampled_8bit, upsample_factor)
-    e_upsampled = np.repeat(e_resampled_8bit, upsample_factor)
-    i_upsampled = np.repeat(i_resampled_8bit, upsample_factor)
+    if mux == 'time':
+        with stage('upsample', processed) as s:
+            if upsample == 'repeat':
+                upsampled = np.repeat(processed, upsample_factor, axis=-1)
+            elif upsample == 'multistage':
+                upsampled = interpolate_multistage(processed, upsample_factor, fs_new, highcut, dtype)
+            else:
+                raise ValueError(f"Modo de sobremuestreo desconocido: {upsample}")
+            s.output(upsampled)
+        with stage('modulate', upsampled) as s:
+            multiplexed = modulate_sum(upsampled, carriers, fs_multiplexed, dtype)
+            s.output(multiplexed)
+    elif mux == 'fft':
+        with stage('multiplex_fft', processed) as s:
+            multiplexed = multiplex_fft(processed, carriers, fs_new, fs_multiplexed, dtype)
+            s.output(multiplexed)
+    else:
+        raise ValueError(f"Modo de multiplexación desconocido: {mux}")
+    return multiplexed
 
-    modulated_a = modulate(a_upsampled, fc1, fs_multiplexed)
-    modulated_e = modulate(e_upsampled, fc2, fs_multiplexed)
-    modulated_i = modulate(i_upsampled, fc3, fs_multiplexed)
+# Recupera un canal por portadora. demux='direct' filtra a la fs multiplexada (camino original,
+# con el pasa banda final a fs), demux='decimate' decima primero, demux='channelizer' separa
+# todas las portadoras en una pasada con el banco de filtros polifásico
+def demultiplex_channels(multiplexed, carriers, fs_multiplexed, fs, fs_new=8000, demux='direct',
+                         lowcut=300.0, highcut=3400.0, dtype=None):
+    if demux == 'direct':
+        with stage('demodulate', multiplexed) as s:
+            demodulated = demodulate(multiplexed, carriers, fs_multiplexed, dtype)
+            s.output(demodulated)
+        with stage('demux_resample', demodulated) as s:
+            taps = kaiser_lowpass_taps(fs_new / 2, fs_multiplexed, dtype=dtype)
+            demuxed = sig.resample_poly(demodulated, 1, fs_multiplexed // fs_new, window=taps, axis=-1)
+            s.output(demuxed)
+        with stage('demux_bandpass', demuxed) as s:
+            demuxed = improved_bandpass_filter(demuxed, lowcut, highcut, fs, dtype=dtype)
+            s.output(demuxed)
+    elif demux == 'decimate':
+        with stage('demodulate_decimated', multiplexed) as s:
+            demuxed = demodulate_decimated(multiplexed, carriers, fs_multiplexed, fs_new, lowcut, highcut, dtype)
+            s.output(demuxed)
+    elif demux == 'channelizer':
+        with stage('channelizer', multiplexed) as s:
+            demuxed = demultiplex_channelizer(multiplexed, carriers, fs_multiplexed, fs_new, lowcut, highcut, dtype)
+            s.output(demuxed)
+    else:
+        raise ValueError(f"Modo de demultiplexación desconocido: {demux}")
+    return demuxed
 
-    multiplexed = modulated_a + modulated_e + modulated_i
+# Aplica func a cada grupo de canales, en el pool de hilos si hay uno
+def _map_groups(executor, func, groups):
+    if executor is None:
+        return [func(group) for group in groups]
+    return list(executor.map(func, groups))
 
-    demod_a = demodulate(multiplexed, fc1, fs_multiplexed)
-    demod_e = demodulate(multiplexed, fc2, fs_multiplexed)
-    demod_i = demodulate(multiplexed, fc3, fs_multiplexed)
+# Motor vectorizado para N canales (ver multiplex_channels/demultiplex_channels para los modos).
+# quantizer='peak' (máximo de toda la señal) o 'agc' (una sola pasada, ver condition_channels).
+# Con workers > 1 los canales se reparten en grupos que se procesan en paralelo en un pool de
+# hilos (NumPy/SciPy liberan el GIL): acondicionamiento y modulación hasta la suma, y la
+# demodulación después. El canalizador ya separa todas las portadoras en una pasada y no se divide.
+# dtype='float32' hace todo el pipeline en precisión simple (ver precision.py)
+def process_channels(signals, fs, carriers=None, fs_multiplexed=None, demux='direct', mux='time',
+                     upsample='repeat', quantizer='peak', workers=1, dtype=None):
+    channels = stack_signals(signals)
+    if carriers is None:
+        carriers = carrier_plan(len(channels))[0]
+    if fs_multiplexed is None:
+        fs_multiplexed = multiplexed_rate(carriers)
+    carriers = np.asarray(carriers, dtype=float)
+    if len(carriers) != len(channels):
+        raise ValueError(f"Se esperaban {len(channels)} portadoras, se recibieron {len(carriers)}")
 
-    nyq = 0.5 * fs_multiplexed
-    cutoff = fs_new / 2
-    N, beta = sig.kaiserord(60, width=(fs_new/2)/nyq)
-    taps = sig.firwin(N, cutoff, window=('kaiser', beta), scale=True, nyq=nyq)
+    lowcut = 300.0
+    highcut = 3400.0
+    fs_new = 8000
+    dtype = float_dtype(dtype)
+    groups = np.array_split(np.arange(len(channels)), max(1, min(workers, len(channels))))
+    executor = ThreadPoolExecutor(len(groups)) if len(groups) > 1 else None
+    try:
+        processed = np.concatenate(_map_groups(executor, lambda g: condition_channels(
+            channels[g], fs, fs_new, lowcut, highcut, quantizer, dtype), groups))
+        # Ventana de modulación y demodulación retenida hasta el final (ver filters.hann_window)
+        window = hann_window(processed.shape[-1] * (fs_multiplexed // fs_new), dtype)
+        multiplexed = sum(_map_groups(executor, lambda g: multiplex_channels(
+            processed[g], carriers[g], fs_multiplexed, fs_new, mux, upsample, highcut, dtype), groups))
+        demux_groups = groups if demux != 'channelizer' else [np.arange(len(channels))]
+        demuxed = np.concatenate(_map_groups(executor, lambda g: demultiplex_channels(
+            multiplexed, carriers[g], fs_multiplexed, fs, fs_new, demux, lowcut, highcut, dtype), demux_groups))
+        del window
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-    demux_a = sig.resample_poly(demod_a, 1, upsample_factor, window=taps)
-    demux_e = sig.resample_poly(demod_e, 1, upsample_factor, window=taps)
-    demux_i = sig.resample_poly(demod_i, 1, upsample_factor, window=taps)
+    return processed, demuxed, fs_multiplexed, multiplexed
+
+# Simulación en banda base compleja: la multiplexación y la demultiplexación se hacen sobre la
+# envolvente compleja del grupo de portadoras (24 KHz para 62/66/70 KHz en lugar de 192 KHz).
+# La señal multiplexada se devuelve como BasebandSignal; to_real() da la señal real a fs_multiplexed
+def process_channels_baseband(signals, fs, carriers=None, fs_multiplexed=None, quantizer='peak', dtype=None):
+    channels = stack_signals(signals)
+    if carriers is None:
+        carriers = carrier_plan(len(channels))[0]
+    if fs_multiplexed is None:
+        fs_multiplexed = multiplexed_rate(carriers)
+    carriers = np.asarray(carriers, dtype=float)
+    if len(carriers) != len(channels):
+        raise ValueError(f"Se esperaban {len(channels)} portadoras, se recibieron {len(carriers)}")
+
+    lowcut = 300.0
+    highcut = 3400.0
+    fs_new = 8000
+    dtype = float_dtype(dtype)
+    processed = condition_channels(channels, fs, fs_new, lowcut, highcut, quantizer, dtype)
+
+    center, fs_baseband = baseband_plan(carriers, fs_new)
+    offsets = carriers - center
+    upsample_factor = fs_baseband // fs_new
+    with stage('upsample', processed) as s:
+        upsampled = interpolate_multistage(processed, upsample_factor, fs_new, highcut, dtype)
+        s.output(upsampled)
+    length = upsampled.shape[-1]
+    window = hann_window(length, dtype)
+    with stage('modulate', upsampled) as s:
+        carrier = carrier_wave(offsets, fs_baseband, length, analytic=True, dtype=dtype)
+        samples = (upsampled * carrier * window).sum(axis=0)
+        s.output(samples)
+
+    # Mezclar con cos(fc t) en la señal real equivale a 0.5 * Re(z e^{-j (fc - center) t})
+    with stage('demodulate_decimated', samples) as s:
+        mixed = samples * np.conj(carrier) * window
+        baseband = decimate_multistage(mixed, upsample_factor, fs_baseband, highcut, dtype)
+        demuxed = improved_bandpass_filter(0.5 * baseband.real, lowcut, highcut, fs_new, dtype=dtype)
+        s.output(demuxed)
+
+    multiplexed = BasebandSignal(samples, center, fs_baseband, fs_multiplexed)
+    return processed, demuxed, fs_multiplexed, multiplexed
+
+def process_signals(a_signal, e_signal, i_signal, fs, demux='direct', mux='time', upsample='repeat',
+                    baseband=False, quantizer='peak', workers=1, dtype=None):
+
+    if a_signal is None or e_signal is None or i_signal is None:
+        raise ValueError("Debe grabar todas las señales primero.")
 
-    demux_a = improved_bandpass_filter(demux_a, lowcut, highcut, fs)
-    demux_e = improved_bandpass_filter(demux_e, lowcut, highcut, fs)
-    demux_i = improved_bandpass_filter(demux_i, lowcut, highcut, fs)
+    if baseband:
+        processed, demuxed, fs_multiplexed, multiplexed = process_channels_baseband(
+            (a_signal, e_signal, i_signal), fs, DEFAULT_CARRIERS, quantizer=quantizer, dtype=dtype)
+    else:
+        processed, demuxed, fs_multiplexed, multiplexed = process_channels(
+            (a_signal, e_signal, i_signal), fs, DEFAULT_CARRIERS, demux=demux, mux=mux, upsample=upsample,
+            quantizer=quantizer, workers=workers, dtype=dtype)
+    processed_a, processed_e, processed_i = processed
+    demux_a, demux_e, demux_i = demuxed
 
     return processed_a, processed_e, processed_i, demux_a, demux_e, demux_i, fs_multiplexed, multiplexed
\ No newline at end of file
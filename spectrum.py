@@ -0,0 +1,85 @@
+import threading
+import weakref
+from collections import OrderedDict
+import numpy as np
+import scipy.fft
+import scipy.signal as sig
+
+# Espectros guardados (se descartan los menos usados)
+SPECTRUM_CACHE_SIZE = 32
+# Segmento de Welch por defecto, en muestras
+WELCH_SEGMENT = 8192
+
+
+# Espectro de amplitud de un solo lado con la escala de |fft(x)| / n: rfft sobre un largo
+# rápido para scipy.fft (con ceros al final), sin calcular la mitad negativa
+def amplitude_spectrum(signal, fs, workers=-1):
+    n = len(signal)
+    n_fft = scipy.fft.next_fast_len(n, real=True)
+    magnitude = np.abs(scipy.fft.rfft(signal, n=n_fft, workers=workers))
+    magnitude /= n
+    return scipy.fft.rfftfreq(n_fft, 1 / fs), magnitude
+
+# Espectro promediado de Welch con la misma escala (una senoidal de amplitud A da A/2):
+# menos varianza y muchos menos puntos para señales largas
+def welch_spectrum(signal, fs, nperseg=WELCH_SEGMENT):
+    frequencies, power = sig.welch(signal, fs, nperseg=min(nperseg, len(signal)), scaling='spectrum')
+    return frequencies, np.sqrt(power / 2)
+
+
+# Resultados memoizados por identidad de la señal (el mismo arreglo, no uno igual) y parámetros.
+# La entrada se borra cuando la señal deja de existir; si la señal se modifica in-place hay que
+# llamar a clear_spectrum_cache()
+_cache = OrderedDict()
+_lock = threading.Lock()
+# Entradas cuyas señales ya no existen, pendientes de borrar
+_dead = []
+
+# Callback de la referencia débil: puede correr en una pasada del GC mientras este mismo hilo
+# tiene el lock, así que no lo toma; sólo anota la entrada y se borra en la próxima llamada
+def _forget(reference, key):
+    _dead.append((key, reference))
+
+# Con el lock tomado. Sólo se borra si la entrada sigue siendo la de esa referencia (el id
+# puede haberse reutilizado para otra señal ya memoizada)
+def _purge():
+    while _dead:
+        key, reference = _dead.pop()
+        entry = _cache.get(key)
+        if entry is not None and entry[0] is reference:
+            del _cache[key]
+
+# Espectro (frecuencias, amplitud) de la señal; method='fft' (rfft completa) o 'welch'.
+# plot_signals y save_plots piden el mismo espectro y sólo el primero lo calcula
+def signal_spectrum(signal, fs, method='fft', nperseg=WELCH_SEGMENT):
+    key = (id(signal), fs, method, nperseg if method == 'welch' else None)
+    with _lock:
+        _purge()
+        entry = _cache.get(key)
+        if entry is not None and entry[0]() is signal:
+            _cache.move_to_end(key)
+            return entry[1]
+
+    if method == 'fft':
+        result = amplitude_spectrum(signal, fs)
+    elif method == 'welch':
+        result = welch_spectrum(signal, fs, nperseg)
+    else:
+        raise ValueError(f"Método de espectro desconocido: {method}")
+
+    try:
+        reference = weakref.ref(signal, lambda reference, key=key: _forget(reference, key))
+    except TypeError:
+        # Listas y otros objetos sin referencias débiles no se memoizan
+        return result
+    with _lock:
+        _purge()
+        _cache[key] = (reference, result)
+        while len(_cache) > SPECTRUM_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+def clear_spectrum_cache():
+    with _lock:
+        _cache.clear()
+        _dead.clear()
@@ -0,0 +1,181 @@
+import os
+import numpy as np
+import scipy.signal as sig
+from filters import bandpass_sos, kaiser_lowpass_taps
+from nco import NCO, carrier_wave
+from precision import as_float, float_dtype
+from quantize import AGCQuantizer, RunningPeakQuantizer, sample_full_scale
+from signalprocessing import DEFAULT_CARRIERS, multiplexed_rate, stack_signals
+from wavio import DEFAULT_BLOCK_SIZE, WavWriter
+
+
+# Filtro SOS que conserva el estado zi entre bloques (filtra sobre el último eje).
+# El estado y la salida tienen el tipo de los coeficientes
+class BlockSOSFilter:
+    def __init__(self, sos):
+        self.sos = sos
+        self.zi = None
+
+    def process(self, block):
+        if self.zi is None:
+            self.zi = np.zeros((self.sos.shape[0],) + block.shape[:-1] + (2,), self.sos.dtype)
+        filtered, self.zi = sig.sosfilt(self.sos, as_float(block, self.sos.dtype), axis=-1, zi=self.zi)
+        return filtered
+
+
+# Decimador FIR polifásico: guarda las últimas muestras y la fase de decimación
+# para que la salida por bloques sea idéntica a la de procesar todo junto
+class BlockDecimator:
+    def __init__(self, taps, factor):
+        self.taps = np.asarray(taps)[::-1]
+        self.factor = factor
+        self.history = None
+        self.offset = 0
+
+    def process(self, block):
+        if self.history is None:
+            self.history = np.zeros(block.shape[:-1] + (len(self.taps) - 1,), self.taps.dtype)
+        buffer = np.concatenate((self.history, block), axis=-1)
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, len(self.taps), axis=-1)
+        decimated = windows[..., self.offset::self.factor, :] @ self.taps
+        self.history = buffer[..., buffer.shape[-1] - self.history.shape[-1]:]
+        self.offset = (self.offset - block.shape[-1]) % self.factor
+        return decimated
+
+
+# Mezcla con portadoras de fase continua entre bloques (una por fila si fc es un arreglo).
+# Con out la portadora se genera ahí y se multiplica in-place, sin temporarios
+class BlockCarrier:
+    def __init__(self, fc, fs, dtype=None):
+        self.nco = NCO(fc, fs, dtype=dtype)
+
+    def process(self, block, out=None):
+        carrier = self.nco.next(block.shape[-1], out)
+        carrier *= block
+        return carrier
+
+    # Suma de las filas mezcladas (una por portadora) acumulada fila a fila en out, con un buffer
+    # de trabajo de una fila, como signalprocessing.modulate_sum; la fase avanza igual que en process
+    def process_sum(self, block, out=None, work=None):
+        nco = self.nco
+        length = block.shape[-1]
+        dtype = np.result_type(block.dtype, nco.dtype)
+        if out is None:
+            out = np.zeros(length, dtype)
+        else:
+            out[...] = 0
+        if work is None:
+            work = np.empty(length, dtype)
+        for row, fc in zip(block, np.atleast_1d(nco.fc)):
+            carrier = carrier_wave(fc, nco.fs, length, nco.position, work, nco.analytic, nco.dtype)
+            carrier *= row
+            out += carrier
+        nco.advance(length)
+        return out
+
+
+# Versión por bloques de process_channels: mantiene el estado de los filtros,
+# del remuestreo y de la fase de las portadoras entre bloques (en el tipo dtype).
+# Con agc=True el piso del AGC es relativo a full_scale (por defecto, el del tipo del primer bloque)
+class StreamingProcessor:
+    def __init__(self, fs, carriers=DEFAULT_CARRIERS, fs_new=8000, fs_multiplexed=None,
+                 lowcut=300.0, highcut=3400.0, agc=False, dtype=None, full_scale=None):
+        if fs_multiplexed is None:
+            fs_multiplexed = multiplexed_rate(carriers, fs_new)
+        self.fs = fs
+        self.fs_new = fs_new
+        self.fs_multiplexed = fs_multiplexed
+        self.carriers = tuple(carriers)
+        self.upsample_factor = fs_multiplexed // fs_new
+
+        self.dtype = float_dtype(dtype)
+
+        decimation_factor = int(fs / fs_new)
+        self.input_filter = BlockSOSFilter(bandpass_sos(lowcut, highcut, fs, dtype=dtype))
+        self.input_decimator = BlockDecimator(kaiser_lowpass_taps(fs_new / 2, fs, dtype=dtype), decimation_factor)
+        self.agc = agc
+        self.full_scale = full_scale
+        self.quantizer = None if agc else RunningPeakQuantizer()
+        self.modulator = BlockCarrier(self.carriers, fs_multiplexed, dtype)
+        self.demodulator = BlockCarrier(self.carriers, fs_multiplexed, dtype)
+        self.demux_filter = BlockSOSFilter(bandpass_sos(lowcut, highcut, fs_multiplexed, dtype=dtype))
+        self.demux_decimator = BlockDecimator(kaiser_lowpass_taps(fs_new / 2, fs_multiplexed, dtype=dtype),
+                                              self.upsample_factor)
+        self.output_filter = BlockSOSFilter(bandpass_sos(lowcut, highcut, fs_new, dtype=dtype))
+        self.buffers = {}
+
+    # Buffer de trabajo reutilizado entre bloques; sólo se recrea si cambia la forma (último bloque)
+    def _buffer(self, name, shape, dtype):
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = self.buffers[name] = np.empty(shape, dtype)
+        return buffer
+
+    def process_block(self, *blocks):
+        if len(blocks) != len(self.carriers):
+            raise ValueError(f"Se esperaban {len(self.carriers)} bloques, se recibieron {len(blocks)}")
+        channels = stack_signals(blocks)
+        if self.quantizer is None:
+            full_scale = sample_full_scale(channels.dtype) if self.full_scale is None else self.full_scale
+            self.quantizer = AGCQuantizer(self.fs_new, full_scale=full_scale)
+
+        filtered = self.input_filter.process(channels)
+        resampled = self.input_decimator.process(filtered)
+        processed = self.quantizer.process(resampled)
+
+        # Las salidas son arreglos nuevos; los intermedios a fs_multiplexed usan buffers propios
+        channels, length = processed.shape
+        shape = (channels, length * self.upsample_factor)
+        upsampled = self._buffer('upsampled', shape, processed.dtype)
+        upsampled.reshape(channels, length, self.upsample_factor)[...] = processed[..., np.newaxis]
+        multiplexed = self.modulator.process_sum(upsampled, np.empty(shape[1], self.dtype),
+                                                 self._buffer('modulation_row', shape[1:], self.dtype))
+
+        demodulated = self.demodulator.process(multiplexed, self._buffer('demodulated', shape, self.dtype))
+        demodulated = self.demux_filter.process(demodulated)
+        demux = self.output_filter.process(self.demux_decimator.process(demodulated))
+
+        return processed, demux, multiplexed
+
+
+# Divide las señales en bloques de tamaño fijo (vistas, sin copiar)
+def iter_signal_blocks(signals, block_size=DEFAULT_BLOCK_SIZE):
+    length = min(len(s) for s in signals)
+    for start in range(0, length, block_size):
+        yield tuple(s[start:start + block_size] for s in signals)
+
+
+# Genera (acondicionadas, demultiplexadas, multiplexada) a medida que llega cada bloque
+def process_signals_streaming(blocks, fs, **kwargs):
+    processor = StreamingProcessor(fs, **kwargs)
+    for block in blocks:
+        yield processor.process_block(*block)
+
+
+# Procesa por bloques y escribe las salidas en output_dir a medida que se generan:
+# conditioned_<nombre>.wav (8 bits), demux_<nombre>.wav y multiplexed.wav en sample_format
+def save_signals_streaming(blocks, fs, output_dir, names=None, sample_format='float32', **kwargs):
+    processor = StreamingProcessor(fs, **kwargs)
+    n = len(processor.carriers)
+    names = names if names is not None else [str(k) for k in range(n)]
+    os.makedirs(output_dir, exist_ok=True)
+    # Fondo de escala: cada canal acondicionado llega a ±127 y la multiplexada suma n canales
+    conditioned = [WavWriter(os.path.join(output_dir, f'conditioned_{name}.wav'), processor.fs_new,
+                             sample_format='int8', full_scale=127) for name in names]
+    demux = [WavWriter(os.path.join(output_dir, f'demux_{name}.wav'), processor.fs_new,
+                       sample_format=sample_format, full_scale=128) for name in names]
+    multiplexed = WavWriter(os.path.join(output_dir, 'multiplexed.wav'), processor.fs_multiplexed,
+                            sample_format=sample_format, full_scale=128 * n)
+    writers = conditioned + demux + [multiplexed]
+    try:
+        for block in blocks:
+            processed, demuxed, mux = processor.process_block(*block)
+            for writer, channel in zip(conditioned, processed):
+                writer.write(channel)
+            for writer, channel in zip(demux, demuxed):
+                writer.write(channel)
+            multiplexed.write(mux)
+    finally:
+        for writer in writers:
+            writer.close()
+    return processor
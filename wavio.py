@@ -0,0 +1,197 @@
+import struct
+import numpy as np
+from scipy.io.wavfile import read
+
+# Bloque por defecto: 200 ms a 24 KHz (también el de streaming y batch, que lo importan de acá)
+DEFAULT_BLOCK_SIZE = 4800
+
+# Formatos de muestra de salida: tipo en disco, código de formato WAV y valor de fondo de escala
+# (los WAV de 8 bits son sin signo con offset de 128; en crudo se escribe int8 con signo)
+SAMPLE_FORMATS = {
+    'float32': (np.dtype('<f4'), 3, None),
+    'int16': (np.dtype('<i2'), 1, 32767),
+    'int8': (np.dtype('i1'), 1, 127),
+}
+# Tamaño máximo de un RIFF común; por encima el encabezado se reescribe como RF64
+RIFF_LIMIT = 0xFFFFFFFF
+
+
+# Lee un WAV sin cargarlo en memoria: los datos son un np.memmap sobre el archivo y las
+# páginas se leen del disco recién cuando se accede a cada bloque
+def read_wav(filename, mmap=True):
+    return read(filename, mmap=mmap)
+
+
+# Vistas [inicio, inicio + block_size) que avanzan block_size - overlap muestras, de modo que
+# bloques consecutivos comparten `overlap` muestras (el último puede ser más corto)
+def iter_chunks(data, block_size=DEFAULT_BLOCK_SIZE, overlap=0):
+    if not 0 <= overlap < block_size:
+        raise ValueError(f"El solapamiento debe estar entre 0 y {block_size - 1} muestras")
+    hop = block_size - overlap
+    length = len(data)
+    stop = max(length - overlap, 1) if length else 0
+    for start in range(0, stop, hop):
+        yield data[start:start + block_size]
+
+
+# Archivo WAV mapeado en memoria, con acceso por canal y por bloques:
+#     with WavReader('largo.wav') as wav:
+#         for block in wav.iter_chunks(4800, overlap=240):
+#             ...
+class WavReader:
+    def __init__(self, filename, mmap=True):
+        self.filename = filename
+        self.fs, self.data = read_wav(filename, mmap)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def channels(self):
+        return 1 if self.data.ndim == 1 else self.data.shape[1]
+
+    @property
+    def duration(self):
+        return len(self) / self.fs
+
+    # Vista (sin copiar) de un canal del archivo
+    def channel(self, index=0):
+        if self.data.ndim == 1:
+            if index != 0:
+                raise IndexError(f"{self.filename} tiene un solo canal")
+            return self.data
+        return self.data[:, index]
+
+    def iter_chunks(self, block_size=DEFAULT_BLOCK_SIZE, overlap=0, channel=0):
+        return iter_chunks(self.channel(channel), block_size, overlap)
+
+    # Suelta la referencia al mapa; el archivo se cierra cuando no quedan vistas vivas
+    def close(self):
+        self.data = None
+
+
+# Bloques alineados y contiguos de varios WAV (uno por señal), cortados en el más corto; sirve
+# de entrada para streaming.process_signals_streaming sin materializar los archivos. No admite
+# solapamiento: el procesador guarda el estado entre bloques y procesaría dos veces las muestras
+# repetidas (para bloques solapados usar WavReader.iter_chunks)
+def iter_wav_blocks(filenames, block_size=DEFAULT_BLOCK_SIZE, channel=0):
+    readers = [WavReader(filename) for filename in filenames]
+    rates = {reader.fs for reader in readers}
+    if len(rates) != 1:
+        raise ValueError(f"Frecuencias de muestreo distintas: {sorted(rates)}")
+    length = min(len(reader) for reader in readers)
+    signals = [reader.channel(channel)[:length] for reader in readers]
+    try:
+        yield from zip(*(iter_chunks(s, block_size) for s in signals))
+    finally:
+        for reader in readers:
+            reader.close()
+
+
+# Escritura incremental de WAV (o binario crudo con raw=True): cada write() agrega un bloque al
+# archivo y close() completa los tamaños del encabezado, así que nunca se guarda la señal entera.
+# Los bloques son (n,) o (canales, n) como en el resto del pipeline. En todos los formatos una
+# amplitud de full_scale corresponde al fondo de escala: ±1.0 en float32 y el máximo del tipo en
+# los enteros (que además se redondean y recortan):
+#     with WavWriter('multiplexed.wav', 192000, sample_format='int16', full_scale=384) as out:
+#         for _, _, multiplexed in process_signals_streaming(...):
+#             out.write(multiplexed)
+class WavWriter:
+    def __init__(self, filename, fs, channels=1, sample_format='float32', full_scale=1.0, raw=False):
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Formato de muestra desconocido: {sample_format} (opciones: {', '.join(SAMPLE_FORMATS)})")
+        self.filename = filename
+        self.fs = fs
+        self.channels = channels
+        self.sample_format = sample_format
+        self.dtype, self.format_tag, self.max_value = SAMPLE_FORMATS[sample_format]
+        self.full_scale = full_scale
+        self.raw = raw
+        self.frames = 0
+        self.file = open(filename, 'wb')
+        if not raw:
+            self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    @property
+    def data_bytes(self):
+        return self.frames * self.channels * self.dtype.itemsize
+
+    # Encabezado con tamaños provisorios; el bloque JUNK reserva lugar para el ds64 de RF64
+    def _write_header(self):
+        block_align = self.channels * self.dtype.itemsize
+        fmt = struct.pack('<HHIIHH', self.format_tag, self.channels, self.fs, self.fs * block_align,
+                          block_align, 8 * self.dtype.itemsize)
+        if self.format_tag != 1:
+            fmt += struct.pack('<H', 0)
+        header = b'RIFF' + struct.pack('<I', 0) + b'WAVE'
+        header += b'JUNK' + struct.pack('<I', 28) + bytes(28)
+        header += b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+        if self.format_tag != 1:
+            self.fact_offset = len(header) + 8
+            header += b'fact' + struct.pack('<II', 4, 0)
+        self.data_offset = len(header) + 8
+        header += b'data' + struct.pack('<I', 0)
+        self.file.write(header)
+
+    def _convert(self, block):
+        if self.max_value is None:
+            return (block * (1.0 / self.full_scale)).astype(self.dtype, copy=False)
+        scaled = np.rint(block * (self.max_value / self.full_scale))
+        np.clip(scaled, -self.max_value, self.max_value, out=scaled)
+        if self.sample_format == 'int8' and not self.raw:
+            return (scaled + 128).astype(np.uint8)
+        return scaled.astype(self.dtype)
+
+    def write(self, block):
+        block = np.asarray(block)
+        if block.ndim == 2:
+            if block.shape[0] != self.channels:
+                raise ValueError(f"Se esperaban {self.channels} canales, se recibieron {block.shape[0]}")
+            block = block.T
+        elif self.channels != 1:
+            raise ValueError(f"Se esperaban {self.channels} canales, se recibió un bloque de un canal")
+        self.file.write(np.ascontiguousarray(self._convert(block)).tobytes())
+        self.frames += block.shape[0]
+
+    def _finalize_header(self):
+        data_bytes = self.data_bytes
+        if data_bytes % 2:
+            # Los bloques RIFF tienen largo par
+            self.file.write(b'\x00')
+        file_size = self.file.tell()
+        if file_size - 8 > RIFF_LIMIT:
+            self.file.seek(0)
+            self.file.write(b'RF64' + struct.pack('<I', RIFF_LIMIT) + b'WAVE')
+            self.file.write(b'ds64' + struct.pack('<IQQQI', 28, file_size - 8, data_bytes, self.frames, 0))
+            data_size = RIFF_LIMIT
+        else:
+            self.file.seek(4)
+            self.file.write(struct.pack('<I', file_size - 8))
+            data_size = data_bytes
+        if self.format_tag != 1:
+            self.file.seek(self.fact_offset)
+            self.file.write(struct.pack('<I', min(self.frames, RIFF_LIMIT)))
+        self.file.seek(self.data_offset - 4)
+        self.file.write(struct.pack('<I', data_size))
+
+    def close(self):
+        if self.file is None:
+            return
+        if not self.raw:
+            self._finalize_header()
+        self.file.close()
+        self.file = None